@@ -1,23 +1,117 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
+import csv
+import functools
+import hashlib
+import io
+import json
 import os
-
-from flask import Flask, jsonify, render_template, request
+import time
+import uuid
+
+import click
+import numpy as np
+from flask import (Flask, Response, g, has_request_context, jsonify, make_response,
+                   render_template, request, send_from_directory, stream_with_context)
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from werkzeug.exceptions import HTTPException
-from sqlalchemy import inspect, text
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import joinedload, object_session
 
+from archive import ARCHIVED_TABLES, archive_ddl, archive_rows, archive_tables, attach
+from cache import VersionedCache
 from config import Config
-
-db = SQLAlchemy()
+from events import RETRY_MS, EventBroker, format_event, parse_topics, serve as serve_events
+from forecast import daily_matrix, forecast
+from geo import GridClusters, LocationIndex
+from jobs import enqueue, run_pool, work
+from json_provider import OrjsonProvider
+from metrics import RequestMetrics
+from migrations import current_version, pending, upgrade
+from matching import match
+from models import FTS_INDEXES, ROLLUP_MEASURES, TOTALS_SOURCES
+from routing import plan_route
+
+READ_BIND_KEY = 'readonly'
+
+
+class RoutingSession(Session):
+    """Sends queries made while serving GET/HEAD requests to the read pool."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context()
+                and request.method in ('GET', 'HEAD')):
+            engine = self._db.engines.get(READ_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def _after_commit(session, key, callback):
+    """Run ``callback`` once ``session`` commits (dropped if it rolls back).
+
+    For invalidating caches: flush-time events fire before other
+    connections can see the change, and the transaction may still fail.
+    """
+    session.info.setdefault('after_commit', {})[key] = callback
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _run_after_commit(session):
+    for callback in session.info.pop('after_commit', {}).values():
+        callback()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_after_commit(session):
+    session.info.pop('after_commit', None)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_TREND_DAYS = 730
+# Tables whose versions make up the analytics ETags
+ANALYTICS_TABLES = ('inventory', 'donation', 'wastage')
+BREAKDOWN_COLUMNS = {'category': 'category', 'platform': 'platform_id'}
+DEFAULT_FORECAST_DAYS = 56
+MAX_FORECAST_DAYS = 365
+FORECAST_MEASURES = {
+    # kind: forecast measures; results are ranked by the first
+    'platform': ('surplus', 'produced'),
+    'ngo': ('demand',),
+}
+MAX_BULK_ITEMS = 50000
+MAX_DONATION_LINES = 1000
+ALLOCATION_BATCH_SIZE = 500
+DONATION_ATTEMPTS = 3
+BULK_CHUNK_SIZE = 5000
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPIRY_STATUSES = ('Available',)
+EXPIRY_BATCH_SIZE = 1000
+MAX_EXPIRY_HOURS = 24 * 30
+CLUSTER_CELL_PX = 64
+MAX_CLUSTER_ZOOM = 22
+MAX_CLUSTERS = 1000
+MAX_ROUTE_STOPS = 1000
 
 def create_app():
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(Config)
+    if app.config['USE_ORJSON'] and OrjsonProvider.available:
+        app.json = OrjsonProvider(app)
+    _configure_engines(app)
     db.init_app(app)
+    _install_sqlite_pragmas(app)
 
     # Initialize models with db instance
     from models import init_models
-    User, Inventory, NGO, Wastage, Donation, FoodPlatform, FoodRequest = init_models(db)
+    (User, Inventory, NGO, Wastage, Donation, FoodPlatform, FoodRequest,
+     AnalyticsTotals, DailyRollup, TableVersion, Job, ChangeEvent) = init_models(db)
 
     # Store models in app for access outside routes
     app.User = User
@@ -27,6 +121,15 @@ def create_app():
     app.Donation = Donation
     app.FoodPlatform = FoodPlatform
     app.FoodRequest = FoodRequest
+    app.AnalyticsTotals = AnalyticsTotals
+    app.DailyRollup = DailyRollup
+    app.TableVersion = TableVersion
+    app.Job = Job
+    app.ChangeEvent = ChangeEvent
+
+    # Archive copies of donation/wastage, attached to every SQLite connection
+    # (empty unless the database is a SQLite file; see archive.py).
+    archived = _install_archive(app)
 
     # ------------------ HELPERS ------------------
 
@@ -59,14 +162,286 @@ def create_app():
         except (TypeError, ValueError):
             return default
 
+    def _parse_fields(value, model):
+        """Parse a comma separated ``fields=`` projection.
+
+        Returns an empty list when no projection was requested and ``None``
+        when any of the names is not a column of ``model``.
+        """
+        if not value:
+            return []
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        columns = model.__table__.c
+        if any(name not in columns for name in names):
+            return None
+        return list(dict.fromkeys(names))
+
+    def _project_row(row, fields):
+        data = {}
+        for name in fields:
+            value = getattr(row, name)
+            data[name] = value.isoformat() if isinstance(value, date) else value
+        return data
+
+    def _search_filter(model, column, value):
+        """Match ``value`` against the model's FTS5 index (prefix per word)."""
+        if db.engine.dialect.name != 'sqlite':
+            return column.ilike(f'%{value}%')
+        fts_name = FTS_INDEXES[model.__tablename__][0]
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in value.split())
+        rowids = (text(f'SELECT rowid FROM {fts_name} WHERE {fts_name} MATCH :match')
+                  .bindparams(match=match)
+                  .columns(rowid=db.Integer))
+        return model.id.in_(rowids)
+
+    def _archived_only(name):
+        """Archived rows of ``name`` not (still) in the hot table; see archive.py."""
+        hot, cold = db.metadata.tables[name], archived[name]
+        return ~db.select(hot.c.id).where(hot.c.id == cold.c.id).exists()
+
+    def _compute_totals():
+        """Aggregate the analytics totals straight from the source tables."""
+        columns = {
+            'total_wasted': Wastage.quantity,
+            'total_donated': Donation.quantity,
+            'total_inventory': Inventory.quantity,
+            'total_remaining': Inventory.quantity_remaining,
+        }
+        totals = {
+            key: float(db.session.query(db.func.sum(column)).scalar() or 0)
+            for key, column in columns.items()
+        }
+        for name, table in archived.items():
+            key = ARCHIVED_TABLES[name][1]
+            totals[key] += float(db.session.execute(
+                db.select(db.func.sum(table.c.quantity)).where(_archived_only(name))
+            ).scalar() or 0)
+        return totals
+
+    def _rollup_from_source(start_date=None):
+        """Aggregate daily rollup buckets straight from the source tables.
+
+        Returns ``{(day, category, platform_id): {measure: total}}``.
+        """
+        category = db.func.coalesce(Inventory.category, 'Human')
+        platform = db.func.coalesce(Inventory.platform_id, 0)
+        sources = {
+            'produced': (Inventory.date_prepared, Inventory.quantity, None),
+            'donated': (Donation.donated_at, Donation.quantity, Donation),
+            'wasted': (Wastage.logged_at, Wastage.quantity, Wastage),
+        }
+        buckets = {}
+        for measure, (date_column, quantity_column, source) in sources.items():
+            day = db.func.date(date_column)
+            query = db.session.query(day, category, platform, db.func.sum(quantity_column))
+            if source is not None:
+                query = (query.select_from(source)
+                         .outerjoin(Inventory, Inventory.id == source.inventory_id))
+            if start_date:
+                query = query.filter(date_column >= start_date)
+            for row_day, row_category, row_platform, total in query.group_by(day, category, platform):
+                if not row_day:
+                    continue
+                key = (str(row_day), row_category, row_platform)
+                bucket = buckets.setdefault(key, dict.fromkeys(ROLLUP_MEASURES, 0.0))
+                bucket[measure] += float(total or 0)
+        # Archived rows keep the category and platform they were archived with.
+        for name, table in archived.items():
+            timestamp, _, measure = ARCHIVED_TABLES[name]
+            day = db.func.date(table.c[timestamp])
+            query = db.select(day, table.c.category, table.c.platform_id,
+                              db.func.sum(table.c.quantity)).where(_archived_only(name))
+            if start_date:
+                query = query.where(table.c[timestamp] >= start_date)
+            for row_day, row_category, row_platform, total in db.session.execute(
+                    query.group_by(day, table.c.category, table.c.platform_id)):
+                if not row_day:
+                    continue
+                key = (str(row_day), row_category, row_platform)
+                bucket = buckets.setdefault(key, dict.fromkeys(ROLLUP_MEASURES, 0.0))
+                bucket[measure] += float(total or 0)
+        return buckets
+
+    def _decrement_stock(item_id, quantity, exhausted_status):
+        """Atomically take ``quantity`` from an inventory item.
+
+        A single conditional UPDATE checks and decrements the stock, so
+        concurrent workers cannot both spend the same units. The item moves
+        to ``exhausted_status`` once nothing remains. Returns an error
+        response (404/409) or ``None``; the caller commits.
+        """
+        remaining = Inventory.quantity_remaining - quantity
+        result = db.session.execute(
+            db.update(Inventory)
+            .where(Inventory.id == item_id, Inventory.quantity_remaining >= quantity)
+            .values(quantity_remaining=remaining,
+                    status=db.case((remaining <= 0, exhausted_status),
+                                   else_=Inventory.status))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return None
+        db.session.rollback()
+        if item_id is None or db.session.get(Inventory, item_id) is None:
+            return _json_error('Inventory item not found.', 404)
+        return _json_error('Insufficient stock remaining for this item.', 409)
+
+    # Last seen versions of the reference tables, see _cached() below.
+    reference_tables = ('ngo', 'food_platform')
+    reference_versions = {'checked_at': float('-inf'), 'versions': {}}
+
+    def _table_versions(tables):
+        """Return ``{table: (version, updated_at)}`` or ``None`` if untracked."""
+        if db.engine.dialect.name != 'sqlite':
+            return None
+        rows = (db.session.query(TableVersion.name, TableVersion.version,
+                                 TableVersion.updated_at)
+                .filter(TableVersion.name.in_(tables)).all())
+        if len(rows) != len(tables):
+            return None
+        # Keep cached reference data no older than any ETag handed out.
+        for name, version, _ in rows:
+            if name in reference_versions['versions']:
+                reference_versions['versions'][name] = version
+        return {name: (version, updated_at) for name, version, updated_at in rows}
+
+    def _conditional(*tables):
+        """Answer GETs with 304 while the listed tables are unchanged.
+
+        The ETag is derived from the request URL and the table versions, so
+        a matching ``If-None-Match`` is answered without running the view's
+        queries or serializing anything. There is no ``Last-Modified``:
+        ``table_version.updated_at`` has one-second resolution, so a write
+        in the same second as a response would not invalidate it.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET':
+                    return view(*args, **kwargs)
+                versions = _table_versions(tables)
+                if versions is None:
+                    return view(*args, **kwargs)
+
+                # The date is part of the tag because some views (trends)
+                # depend on "today".
+                basis = [request.full_path, datetime.utcnow().date().isoformat()]
+                basis += [f'{name}:{versions[name][0]}' for name in sorted(versions)]
+                etag = hashlib.sha1('|'.join(basis).encode()).hexdigest()
+
+                if request.if_none_match.contains(etag):
+                    response = Response(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag)
+                response.cache_control.no_cache = True
+                return response
+            return wrapper
+        return decorator
+
+    def _json_default(value):
+        if isinstance(value, date):
+            return value.isoformat()
+        raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
     def _json_error(message, status_code=400):
         response = jsonify({'status': 'error', 'error': message})
         response.status_code = status_code
         return response
     
+    # Reference data (NGOs, food platforms) rarely changes. It is cached per
+    # worker and keyed by the shared table versions, re-read at most once per
+    # REFERENCE_VERSION_CHECK_SECONDS, so writes from any worker invalidate it.
+    reference_cache = VersionedCache(maxsize=app.config['REFERENCE_CACHE_SIZE'],
+                                     ttl=app.config['REFERENCE_CACHE_TTL'])
+    app.reference_cache = reference_cache
+
+    def _cached(key, tables, loader):
+        now = time.monotonic()
+        interval = app.config['REFERENCE_VERSION_CHECK_SECONDS']
+        if now - reference_versions['checked_at'] >= interval:
+            versions = _table_versions(reference_tables) or {}
+            reference_versions['versions'] = {
+                name: version for name, (version, _) in versions.items()}
+            reference_versions['checked_at'] = now
+        version = tuple(reference_versions['versions'].get(table) for table in tables)
+        return reference_cache.get(key, version, loader)
+
+    def _invalidate_reference_cache():
+        reference_cache.invalidate()
+        reference_versions['checked_at'] = float('-inf')
+
+    def _reference_changed(mapper, connection, target):
+        _after_commit(object_session(target), reference_cache, _invalidate_reference_cache)
+
+    for model in (NGO, FoodPlatform):
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, _reference_changed)
+
+    def _all_ngos():
+        return _cached('ngos', ('ngo',), lambda: [n.to_dict() for n in NGO.query.all()])
+
+    def _all_platforms():
+        return _cached('food_platforms', ('food_platform',),
+                       lambda: [p.to_dict() for p in FoodPlatform.query.all()])
+
+    def _located(entities):
+        return [e for e in entities if e['latitude'] is not None and e['longitude'] is not None]
+
+    # Per-request instrumentation: latency, SQL count/time and response size
+    # per route, exported at /api/metrics and in Server-Timing headers.
+    request_metrics = RequestMetrics()
+    app.request_metrics = request_metrics
+
+    def _route_label():
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+
+    def _record_query(statement, seconds, total=None):
+        """Count ``seconds`` of SQL time: the execution (``total`` is None)
+        or a later fetch, ``total`` being the statement's time so far."""
+        executed = total is None
+        total = seconds if executed else total
+        route = None
+        if has_request_context():
+            g.sql_queries = g.get('sql_queries', 0) + executed
+            g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+            route = _route_label()
+        # Logged once, when the statement's time crosses the threshold.
+        if total >= app.config['SLOW_QUERY_MS'] / 1000 > total - seconds:
+            app.logger.warning('Slow query (%.1f ms) on %s: %s', total * 1000,
+                               route or '-', ' '.join(statement.split())[:500])
+            request_metrics.observe_slow_query(route or 'none')
+
+    _install_query_metrics(app, _record_query)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        queries, sql_seconds = g.sql_queries, g.sql_seconds
+        size = None if response.is_streamed else response.calculate_content_length()
+        request_metrics.observe_request(request.method, _route_label(), response.status_code,
+                                        elapsed, queries, sql_seconds, size)
+        if app.config['SERVER_TIMING']:
+            response.headers.add(
+                'Server-Timing',
+                f'app;dur={elapsed * 1000:.1f}, '
+                f'db;dur={sql_seconds * 1000:.1f};desc="{queries} queries"')
+        return response
+
     @app.context_processor
     def inject_globals():
-        return {'datetime': datetime}
+        return {'datetime': datetime, 'events_url': app.config['EVENTS_URL']}
 
     @app.errorhandler(Exception)
     def handle_exception(error):
@@ -89,8 +464,7 @@ def create_app():
 
     @app.route('/inventory')
     def inventory_page():
-        platforms = FoodPlatform.query.all()
-        return render_template('inventory.html', platforms=platforms)
+        return render_template('inventory.html', platforms=_all_platforms())
 
     @app.route('/surplus-food')
     def surplus_food_page():
@@ -106,24 +480,16 @@ def create_app():
 
     @app.route('/requests')
     def requests_page():
-        ngos = NGO.query.all()
-        return render_template('requests.html', ngos=ngos)
+        return render_template('requests.html', ngos=_all_ngos())
 
     @app.route('/restaurants')
     def restaurants_page():
-        platforms = FoodPlatform.query.all()
-        return render_template('restaurants.html', platforms=platforms)
+        return render_template('restaurants.html', platforms=_all_platforms())
 
     @app.route('/maps')
     def maps_page():
-        ngo_count = NGO.query.filter(
-            NGO.latitude.isnot(None),
-            NGO.longitude.isnot(None)
-        ).count()
-        platform_count = FoodPlatform.query.filter(
-            FoodPlatform.latitude.isnot(None),
-            FoodPlatform.longitude.isnot(None)
-        ).count()
+        ngo_count = len(_located(_all_ngos()))
+        platform_count = len(_located(_all_platforms()))
         google_maps_key = app.config.get('GOOGLE_MAPS_API_KEY', '').strip()
         
         # Check if API key is set and not placeholder
@@ -140,6 +506,7 @@ def create_app():
     # ------------------ API ROUTES ------------------
 
     @app.route('/api/inventory', methods=['GET', 'POST'])
+    @_conditional('inventory', 'food_platform')
     def api_inventory():
         if request.method == 'GET':
             query = Inventory.query.order_by(Inventory.id.desc())
@@ -148,15 +515,52 @@ def create_app():
             category = request.args.get('category')
             platform_id = request.args.get('platform_id')
             if status:
-                query = query.filter(Inventory.status.ilike(f'%{status}%'))
-            if search:
-                query = query.filter(Inventory.item_type.ilike(f'%{search}%'))
+                query = query.filter(Inventory.status == status.strip().title())
+            if search and search.strip():
+                query = query.filter(_search_filter(Inventory, Inventory.item_type, search))
             if category:
-                query = query.filter(Inventory.category.ilike(f'%{category}%'))
+                query = query.filter(Inventory.category == category.strip().title())
             if platform_id:
                 query = query.filter(Inventory.platform_id == platform_id)
-            items = query.all()
-            return jsonify([i.to_dict() for i in items])
+
+            fields = _parse_fields(request.args.get('fields'), Inventory)
+            if fields is None:
+                return _json_error('Unknown field requested.')
+            if fields:
+                # Select only the requested columns; the id is always fetched
+                # so the next cursor can be computed.
+                columns = [Inventory.__table__.c[name] for name in fields]
+                if 'id' not in fields:
+                    columns.append(Inventory.id)
+                query = query.with_entities(*columns)
+
+                def serialize(row):
+                    return _project_row(row, fields)
+            else:
+                query = query.options(joinedload(Inventory.platform))
+
+                def serialize(item):
+                    return item.to_dict()
+
+            if 'limit' not in request.args and 'after' not in request.args:
+                return jsonify([serialize(row) for row in query.all()])
+
+            limit = _parse_int(request.args.get('limit', DEFAULT_PAGE_SIZE), DEFAULT_PAGE_SIZE)
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            after = request.args.get('after')
+            if after:
+                after_id = _parse_int(after, None)
+                if after_id is None:
+                    return _json_error('Invalid cursor.')
+                query = query.filter(Inventory.id < after_id)
+
+            # Fetch one extra row to know whether another page exists.
+            rows = query.limit(limit + 1).all()
+            next_cursor = str(rows[limit - 1].id) if len(rows) > limit else None
+            return jsonify({
+                'items': [serialize(row) for row in rows[:limit]],
+                'next_cursor': next_cursor
+            })
 
         data = request.get_json(silent=True) or {}
         item_type = (data.get('item_type') or '').strip()
@@ -246,7 +650,93 @@ def create_app():
         db.session.commit()
         return jsonify({'status': 'ok', 'item': item.to_dict()})
 
+    def _expiry_cutoff(within_hours=0.0, now=None):
+        """Latest ``date_prepared`` of items expiring within ``within_hours``.
+
+        Items expire INVENTORY_SHELF_LIFE_HOURS after the start of the day
+        they were prepared, so the test is a range on the (status,
+        date_prepared) index.
+        """
+        now = now or datetime.utcnow()
+        shelf_life = timedelta(hours=app.config['INVENTORY_SHELF_LIFE_HOURS'])
+        return (now + timedelta(hours=within_hours) - shelf_life).date()
+
+    def _expiring_filter(cutoff):
+        return db.and_(Inventory.status.in_(EXPIRY_STATUSES),
+                       Inventory.date_prepared <= cutoff,
+                       Inventory.quantity_remaining > 0)
+
+    def _sweep_expired(now=None, batch_size=EXPIRY_BATCH_SIZE, progress=None):
+        """Mark expired stock as Expired and log what was left as wastage.
+
+        Works in batches of ``batch_size`` items, one transaction each: an
+        INSERT ... SELECT writes the Wastage rows and a single UPDATE marks
+        the items, so the totals, rollup and change-feed triggers run inside
+        the same transaction. Swept items leave the index range, so every
+        batch starts at the next expired item.
+        """
+        now = now or datetime.utcnow()
+        expired = _expiring_filter(_expiry_cutoff(0, now))
+        total = (db.session.execute(db.select(db.func.count()).where(expired)).scalar()
+                 if progress else 0)
+        swept = {'items': 0, 'wastage_entries': 0, 'quantity': 0.0}
+        while True:
+            ids = db.session.execute(
+                db.select(Inventory.id).where(expired).limit(batch_size).with_for_update()
+            ).scalars().all()
+            if not ids:
+                break
+            batch = db.and_(Inventory.id.in_(ids), expired)
+            leftover = db.and_(batch, Inventory.quantity_remaining > 0)
+            swept['wastage_entries'] += db.session.execute(
+                db.insert(Wastage).from_select(
+                    ['inventory_id', 'quantity', 'reason', 'logged_at'],
+                    db.select(Inventory.id, Inventory.quantity_remaining,
+                              db.literal('Expired'), db.literal(now, db.DateTime))
+                    .where(leftover))
+            ).rowcount
+            swept['quantity'] += db.session.execute(
+                db.select(db.func.coalesce(db.func.sum(Inventory.quantity_remaining), 0))
+                .where(leftover)).scalar()
+            swept['items'] += db.session.execute(
+                db.update(Inventory).where(batch)
+                .values(status='Expired', quantity_remaining=0)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if progress and total:
+                progress(swept['items'] / total)
+        return swept
+
+    @app.route('/api/inventory/expiring', methods=['GET'])
+    def api_inventory_expiring():
+        """Items still in stock that expire within ``within_hours`` (default 24).
+
+        Already expired items that have not been swept yet are included.
+        Ordered by expiry; ``limit`` caps the result.
+        """
+        within_hours = _parse_float(request.args.get('within_hours', 24))
+        if within_hours is None or not 0 <= within_hours <= MAX_EXPIRY_HOURS:
+            return _json_error(f'within_hours must be between 0 and {MAX_EXPIRY_HOURS}.')
+        limit = _parse_int(request.args.get('limit', DEFAULT_PAGE_SIZE), DEFAULT_PAGE_SIZE)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        shelf_life = timedelta(hours=app.config['INVENTORY_SHELF_LIFE_HOURS'])
+        items = (Inventory.query
+                 .filter(_expiring_filter(_expiry_cutoff(within_hours)))
+                 .order_by(Inventory.date_prepared, Inventory.id)
+                 .options(joinedload(Inventory.platform))
+                 .limit(limit).all())
+        result = []
+        for item in items:
+            data = item.to_dict()
+            data['expires_at'] = (datetime.combine(item.date_prepared, datetime.min.time())
+                                  + shelf_life).isoformat()
+            result.append(data)
+        return jsonify(result)
+
     @app.route('/api/surplus-food', methods=['GET', 'POST'])
+    @_conditional('wastage')
     def api_surplus_food():
         if request.method == 'GET':
             limit = _parse_int(request.args.get('limit', 20), 20)
@@ -263,22 +753,22 @@ def create_app():
             return _json_error('Quantity must be greater than zero.')
         reason = (data.get('reason') or 'Not specified').strip()
 
-        inv = Inventory.query.get(inventory_id)
-        if not inv:
-            return _json_error('Inventory item not found.', 404)
+        inventory_id = _parse_int(inventory_id, None)
+        error = _decrement_stock(inventory_id, quantity, 'Surplus')
+        if error:
+            return error
 
         entry = Wastage(
-            inventory_id=inv.id,
+            inventory_id=inventory_id,
             quantity=quantity,
             reason=reason or 'Not specified'
         )
-        inv.quantity_remaining = max(0, inv.quantity_remaining - quantity)
-        inv.status = 'Surplus' if inv.quantity_remaining == 0 else inv.status
         db.session.add(entry)
         db.session.commit()
         return jsonify({'status': 'ok', 'entry': entry.to_dict()})
 
     @app.route('/api/donations', methods=['GET', 'POST'])
+    @_conditional('donation')
     def api_donations():
         if request.method == 'GET':
             limit = _parse_int(request.args.get('limit', 20), 20)
@@ -295,95 +785,449 @@ def create_app():
         if quantity is None or quantity <= 0:
             return _json_error('Quantity must be greater than zero.')
 
-        inv = Inventory.query.get(inventory_id)
-        if not inv:
-            return _json_error('Inventory item not found.', 404)
         ngo = NGO.query.get(ngo_id)
         if not ngo:
             return _json_error('NGO not found.', 404)
+        inventory_id = _parse_int(inventory_id, None)
+        error = _decrement_stock(inventory_id, quantity, 'Donated')
+        if error:
+            return error
 
         entry = Donation(
-            inventory_id=inv.id,
+            inventory_id=inventory_id,
             ngo_id=ngo.id,
             quantity=quantity
         )
-        inv.quantity_remaining = max(0, inv.quantity_remaining - quantity)
-        inv.status = 'Donated' if inv.quantity_remaining == 0 else inv.status
         db.session.add(entry)
         db.session.commit()
         return jsonify({'status': 'ok', 'entry': entry.to_dict()})
 
+    def _allocate_fifo(category, quantity, platform_id=None, taken=None):
+        """Lines taking ``quantity`` from the oldest available stock of a category.
+
+        Reads the ``(status, date_prepared)`` index in batches until the
+        quantity is covered; ``taken`` maps item ids to units already spoken
+        for. Returns ``(lines, shortfall)``.
+        """
+        taken = taken or {}
+        query = (db.session.query(Inventory.id, Inventory.quantity_remaining)
+                 .filter(Inventory.status == 'Available', Inventory.category == category,
+                         Inventory.quantity_remaining > 0)
+                 .order_by(Inventory.date_prepared, Inventory.id))
+        if platform_id is not None:
+            query = query.filter(Inventory.platform_id == platform_id)
+        lines, needed, offset = [], quantity, 0
+        while needed > 1e-9:
+            rows = query.offset(offset).limit(ALLOCATION_BATCH_SIZE).all()
+            for item_id, remaining in rows:
+                take = min(remaining - taken.get(item_id, 0.0), needed)
+                if take > 1e-9:
+                    lines.append((item_id, take))
+                    needed -= take
+                    if needed <= 1e-9:
+                        break
+            if len(rows) < ALLOCATION_BATCH_SIZE:
+                break
+            offset += ALLOCATION_BATCH_SIZE
+        return lines, max(needed, 0.0)
+
+    def _donate_lines(ngo_id, lines):
+        """Decrement stock and record donations for ``{item_id: quantity}``.
+
+        The same conditional decrement as _decrement_stock, for every line in
+        one executemany. Returns False, with nothing inserted, if any line
+        lacked the stock; the caller commits or rolls back.
+        """
+        take = db.bindparam('take')
+        remaining = Inventory.quantity_remaining - take
+        updated = db.session.execute(
+            db.update(Inventory.__table__)
+            .where(Inventory.id == db.bindparam('item_id'),
+                   Inventory.quantity_remaining >= take)
+            .values(quantity_remaining=remaining,
+                    status=db.case((remaining <= 0, 'Donated'), else_=Inventory.status)),
+            [{'item_id': item_id, 'take': quantity} for item_id, quantity in lines.items()],
+        ).rowcount
+        if updated != len(lines):
+            return False
+        db.session.execute(db.insert(Donation.__table__), [
+            {'inventory_id': item_id, 'ngo_id': ngo_id, 'quantity': quantity}
+            for item_id, quantity in lines.items()
+        ])
+        return True
+
+    @app.route('/api/donations/batch', methods=['POST'])
+    def api_donation_batch():
+        """Donate many inventory lines to one NGO in a single transaction.
+
+        Body: ``{"ngo_id": ..., "items": [{"inventory_id": ..., "quantity": ...}],
+        "allocate": {"category": ..., "quantity": ..., "platform_id": ...}}``.
+        ``allocate`` (optional, as is ``items``) takes the quantity from the
+        oldest available stock of the category. Either every line is
+        donated or none is: invalid lines return 400, unknown items 404 and
+        short stock 409, each with the offending lines.
+        """
+        data = request.get_json(silent=True) or {}
+        items = data.get('items') or []
+        allocate = data.get('allocate')
+        if not isinstance(items, list) or (allocate is not None and not isinstance(allocate, dict)):
+            return _json_error('Items must be a list and allocate an object.')
+        if len(items) > MAX_DONATION_LINES:
+            return _json_error(f'At most {MAX_DONATION_LINES} items per batch.', 413)
+        if not items and not allocate:
+            return _json_error('Provide items or allocate.')
+        ngo = db.session.get(NGO, _parse_int(data.get('ngo_id'), None) or 0)
+        if ngo is None:
+            return _json_error('NGO not found.', 404)
+
+        wanted, errors = {}, []
+        for index, line in enumerate(items):
+            line = line if isinstance(line, dict) else {}
+            item_id = _parse_int(line.get('inventory_id'), None)
+            quantity = _parse_float(line.get('quantity'))
+            if item_id is None or quantity is None or quantity <= 0:
+                errors.append({'index': index,
+                               'error': 'Inventory ID and a positive quantity are required.'})
+                continue
+            wanted[item_id] = wanted.get(item_id, 0.0) + quantity
+        if errors:
+            return jsonify({'status': 'error', 'error': 'Invalid lines.', 'errors': errors}), 400
+
+        stock = dict(db.session.query(Inventory.id, Inventory.quantity_remaining)
+                     .filter(Inventory.id.in_(wanted)).all()) if wanted else {}
+        missing = [{'inventory_id': item_id, 'error': 'Inventory item not found.'}
+                   for item_id in wanted if item_id not in stock]
+        if missing:
+            return jsonify({'status': 'error', 'error': 'Inventory items not found.',
+                            'errors': missing}), 404
+        short = [{'inventory_id': item_id, 'requested': quantity,
+                  'available': stock[item_id]}
+                 for item_id, quantity in wanted.items() if stock[item_id] < quantity]
+        if short:
+            return jsonify({'status': 'error', 'error': 'Insufficient stock remaining.',
+                            'errors': short}), 409
+
+        if allocate:
+            category = (allocate.get('category') or '').strip().title()
+            quantity = _parse_float(allocate.get('quantity'))
+            platform_id = allocate.get('platform_id')
+            if not category or quantity is None or quantity <= 0:
+                return _json_error('Allocate needs a category and a positive quantity.')
+            if platform_id is not None and _parse_int(platform_id, None) is None:
+                return _json_error('Platform ID must be an integer.')
+            platform_id = _parse_int(platform_id, None)
+
+        ngo_id = ngo.id
+        # Concurrent batches may pick the same oldest stock; the loser
+        # rolls back and allocates again from what is left.
+        for _ in range(DONATION_ATTEMPTS):
+            lines = dict(wanted)
+            if allocate:
+                allocated, shortfall = _allocate_fifo(category, quantity, platform_id, wanted)
+                if shortfall > 1e-9:
+                    db.session.rollback()
+                    return _json_error(
+                        f'Only {quantity - shortfall:g} of {quantity:g} available in {category}.',
+                        409)
+                for item_id, take in allocated:
+                    lines[item_id] = lines.get(item_id, 0.0) + take
+            if len(lines) > MAX_DONATION_LINES:
+                # Allocation can add lines beyond those in the body.
+                db.session.rollback()
+                return _json_error(f'At most {MAX_DONATION_LINES} items per batch.', 413)
+            if _donate_lines(ngo_id, lines):
+                break
+            db.session.rollback()
+        else:
+            return _json_error('Stock changed while donating; nothing was donated.', 409)
+        db.session.commit()
+        return jsonify({
+            'status': 'ok',
+            'ngo_id': ngo_id,
+            'donations': len(lines),
+            'quantity': sum(lines.values()),
+            'lines': [{'inventory_id': item_id, 'quantity': take}
+                      for item_id, take in lines.items()],
+        }), 201
+
     @app.route('/api/ngos', methods=['GET'])
+    @_conditional('ngo')
     def api_ngos():
-        return jsonify([n.to_dict() for n in NGO.query.all()])
+        return jsonify(_all_ngos())
 
     @app.route('/api/food-platforms', methods=['GET'])
+    @_conditional('food_platform')
     def api_food_platforms():
-        return jsonify([p.to_dict() for p in FoodPlatform.query.all()])
+        return jsonify(_all_platforms())
 
     @app.route('/api/locations', methods=['GET'])
+    @_conditional('ngo', 'food_platform')
     def api_locations():
         """Get all NGOs and Food Platforms with location data"""
-        ngos = NGO.query.filter(
-            NGO.latitude.isnot(None),
-            NGO.longitude.isnot(None)
-        ).all()
-        platforms = FoodPlatform.query.filter(
-            FoodPlatform.latitude.isnot(None),
-            FoodPlatform.longitude.isnot(None)
-        ).all()
         return jsonify({
-            'ngos': [n.to_dict() for n in ngos],
-            'platforms': [p.to_dict() for p in platforms]
+            'ngos': _located(_all_ngos()),
+            'platforms': _located(_all_platforms())
         })
 
-    @app.route('/api/restaurants/submissions', methods=['POST'])
-    def api_restaurant_submissions():
-        data = request.get_json(silent=True) or {}
+    # In-memory spatial indexes, rebuilt lazily after NGO/platform changes.
+    location_models = {'ngo': NGO, 'platform': FoodPlatform}
+    location_sources = {'ngo': _all_ngos, 'platform': _all_platforms}
+
+    def _location_clusters(kind, zoom):
+        """Clusters of one kind at ``zoom`` and the names of their points."""
+        def build():
+            located = _located(location_sources[kind]())
+            clusters = GridClusters([e['id'] for e in located],
+                                    [e['latitude'] for e in located],
+                                    [e['longitude'] for e in located],
+                                    zoom, CLUSTER_CELL_PX)
+            names = [e['name'] for e in located]
+            return clusters, names
+
+        table = location_models[kind].__tablename__
+        return _cached(f'location_clusters:{kind}:{zoom}', (table,), build)
+
+    def _parse_bbox(value):
+        """Parse ``west,south,east,north``; returns ``None`` if invalid."""
+        if not value:
+            return -180.0, -90.0, 180.0, 90.0
+        parts = [_parse_float(part) for part in value.split(',')]
+        if len(parts) != 4 or None in parts:
+            return None
+        west, south, east, north = parts
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            return None
+        return west, south, east, north
+
+    @app.route('/api/locations/clusters', methods=['GET'])
+    @_conditional('ngo', 'food_platform')
+    def api_location_clusters():
+        """Clustered NGO and food platform markers for a map viewport.
+
+        Points within the same CLUSTER_CELL_PX square at ``zoom`` (0-22)
+        form one cluster. ``bbox`` is ``west,south,east,north`` (default:
+        the world; west > east crosses the antimeridian). Each kind comes
+        back as parallel arrays, at most MAX_CLUSTERS entries; ``id`` and
+        ``name`` are null for clusters of more than one point.
+        """
+        zoom = _parse_int(request.args.get('zoom'), None)
+        if zoom is None or not 0 <= zoom <= MAX_CLUSTER_ZOOM:
+            return _json_error(f'zoom must be an integer between 0 and {MAX_CLUSTER_ZOOM}.')
+        bbox = _parse_bbox(request.args.get('bbox'))
+        if bbox is None:
+            return _json_error('bbox must be west,south,east,north in degrees.')
+        kind = request.args.get('kind', 'all')
+        if kind not in ('ngo', 'platform', 'all'):
+            return _json_error('Kind must be ngo, platform or all.')
+        west, south, east, north = bbox
+
+        result = {'zoom': zoom}
+        for k in (list(location_models) if kind == 'all' else [kind]):
+            clusters, names = _location_clusters(k, zoom)
+            positions = clusters.within(south, west, north, east, MAX_CLUSTERS)
+            ids = clusters.ids[positions].tolist()
+            result[k] = {
+                'lat': clusters.lats[positions].round(5).tolist(),
+                'lng': clusters.lngs[positions].round(5).tolist(),
+                'count': clusters.counts[positions].tolist(),
+                'id': [None if i < 0 else i for i in ids],
+                'name': [None if i < 0 else names[first] for i, first
+                         in zip(ids, clusters.first[positions].tolist())],
+            }
+        return jsonify(result)
+
+    def _location_index(kind):
+        model = location_models[kind]
+
+        def build():
+            rows = db.session.query(model.id, model.latitude, model.longitude).filter(
+                model.latitude.isnot(None),
+                model.longitude.isnot(None)
+            ).all()
+            return LocationIndex(*zip(*rows)) if rows else LocationIndex([], [], [])
+
+        return _cached(f'location_index:{kind}', (model.__tablename__,), build)
+
+    @app.route('/api/nearby', methods=['GET'])
+    @_conditional('ngo', 'food_platform')
+    def api_nearby():
+        """NGOs and/or food platforms within ``radius_km``, nearest first."""
+        lat = _parse_float(request.args.get('lat'))
+        lng = _parse_float(request.args.get('lng'))
+        if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+            return _json_error('Valid lat and lng are required.')
+        radius_km = _parse_float(request.args.get('radius_km', 10))
+        if radius_km is None or radius_km <= 0:
+            return _json_error('Radius must be greater than zero.')
+        kind = request.args.get('kind', 'all')
+        if kind not in ('ngo', 'platform', 'all'):
+            return _json_error('Kind must be ngo, platform or all.')
+        limit = max(1, min(_parse_int(request.args.get('limit', 50), 50), MAX_PAGE_SIZE))
+
+        kinds = list(location_models) if kind == 'all' else [kind]
+        matches = sorted(
+            ((distance, k, entity_id)
+             for k in kinds
+             for entity_id, distance in _location_index(k).query(lat, lng, radius_km, limit)),
+        )[:limit]
+
+        entities = {}
+        for k in kinds:
+            ids = [entity_id for _, match_kind, entity_id in matches if match_kind == k]
+            if ids:
+                model = location_models[k]
+                entities[k] = {e.id: e for e in model.query.filter(model.id.in_(ids))}
+
+        results = []
+        for distance, k, entity_id in matches:
+            entity = entities[k].get(entity_id)
+            if entity is not None:
+                results.append({**entity.to_dict(), 'kind': k,
+                                'distance_km': round(distance, 3)})
+        return jsonify({'results': results})
+
+    def _validate_submission(data, find_platform):
+        """Validate a restaurant submission.
+
+        Returns ``(values, None)`` with the new Inventory column values or
+        ``(None, (message, status_code))``.
+        """
         platform_id = data.get('platform_id')
         if not platform_id:
-            return _json_error('Food platform ID is required.')
-        platform = FoodPlatform.query.get(platform_id)
+            return None, ('Food platform ID is required.', 400)
+        platform = find_platform(platform_id)
         if not platform:
-            return _json_error('Food platform not found.', 404)
+            return None, ('Food platform not found.', 404)
 
         item_type = (data.get('item_type') or '').strip()
         if not item_type:
-            return _json_error('Item type is required.')
+            return None, ('Item type is required.', 400)
 
         quantity = _parse_float(data.get('quantity'))
         if quantity is None or quantity <= 0:
-            return _json_error('Quantity must be greater than zero.')
+            return None, ('Quantity must be greater than zero.', 400)
 
         category = (data.get('category') or 'Human').strip().title()
         if category not in ['Human', 'Pet']:
-            return _json_error('Category must be Human or Pet.')
+            return None, ('Category must be Human or Pet.', 400)
 
         date_prepared = _parse_date(data.get('date_prepared')) or datetime.utcnow().date()
 
-        item = Inventory(
-            item_type=item_type,
-            quantity=quantity,
-            quantity_remaining=quantity,
-            date_prepared=date_prepared,
-            status='Available',
-            category=category,
-            platform_id=platform.id
-        )
+        return {
+            'item_type': item_type,
+            'quantity': quantity,
+            'quantity_remaining': quantity,
+            'date_prepared': date_prepared,
+            'status': 'Available',
+            'category': category,
+            'platform_id': platform.id,
+        }, None
+
+    @app.route('/api/restaurants/submissions', methods=['POST'])
+    def api_restaurant_submissions():
+        data = request.get_json(silent=True) or {}
+        values, error = _validate_submission(data, FoodPlatform.query.get)
+        if error:
+            return _json_error(*error)
+
+        item = Inventory(**values)
         db.session.add(item)
         db.session.commit()
         return jsonify({'status': 'ok', 'item': item.to_dict()}), 201
 
+    def _ingest_submissions(entries, progress=None):
+        """Validate and insert submissions; returns ``(inserted, errors)``.
+
+        Without ``progress`` everything is inserted in one transaction. With
+        it, rows are committed in chunks and ``progress`` is told the share
+        of rows inserted so far.
+        """
+        # Resolve every referenced platform with a single query.
+        platform_ids = {
+            _parse_int(entry.get('platform_id'), None)
+            for entry in entries if isinstance(entry, dict)
+        }
+        platform_ids.discard(None)
+        platforms = {}
+        if platform_ids:
+            platforms = {
+                platform.id: platform
+                for platform in FoodPlatform.query.filter(FoodPlatform.id.in_(platform_ids))
+            }
+
+        def find_platform(platform_id):
+            return platforms.get(_parse_int(platform_id, None))
+
+        rows, errors = [], []
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                errors.append({'index': index, 'error': 'Each submission must be a JSON object.'})
+                continue
+            values, error = _validate_submission(entry, find_platform)
+            if error:
+                errors.append({'index': index, 'error': error[0]})
+            else:
+                rows.append(values)
+
+        if not rows:
+            return 0, errors
+        chunk = len(rows) if progress is None else BULK_CHUNK_SIZE
+        for offset in range(0, len(rows), chunk):
+            db.session.execute(Inventory.__table__.insert(), rows[offset:offset + chunk])
+            if progress is not None:
+                db.session.commit()
+                progress((offset + chunk) / len(rows))
+        db.session.commit()
+        return len(rows), errors
+
+    @app.route('/api/restaurants/submissions/bulk', methods=['POST'])
+    def api_restaurant_submissions_bulk():
+        """Insert many submissions in one transaction.
+
+        Accepts a JSON array or NDJSON (``application/x-ndjson``, one object
+        per line). Valid rows are inserted; invalid rows are reported by index.
+        """
+        if request.mimetype == 'application/x-ndjson':
+            entries = []
+            for line in request.get_data(cache=False).splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(app.json.loads(line))
+                except ValueError:
+                    entries.append(None)
+        else:
+            entries = request.get_json(silent=True)
+            if not isinstance(entries, list):
+                return _json_error('Expected a JSON array of submissions.')
+        if not entries:
+            return _json_error('No submissions provided.')
+        if len(entries) > MAX_BULK_ITEMS:
+            return _json_error(f'At most {MAX_BULK_ITEMS} submissions per request.', 413)
+
+        inserted, errors = _ingest_submissions(entries)
+        if not inserted:
+            return jsonify({'status': 'error', 'inserted': 0, 'errors': errors}), 400
+        return jsonify({'status': 'ok', 'inserted': inserted, 'errors': errors}), 201
+
     @app.route('/api/food-requests', methods=['GET', 'POST'])
+    @_conditional('food_request', 'ngo', 'food_platform')
     def api_food_requests():
         if request.method == 'GET':
-            query = FoodRequest.query.order_by(FoodRequest.created_at.desc())
+            query = (FoodRequest.query
+                     .options(joinedload(FoodRequest.ngo),
+                              joinedload(FoodRequest.claimed_platform))
+                     .order_by(FoodRequest.created_at.desc()))
             status = request.args.get('status')
             request_type = request.args.get('type')
+            search = request.args.get('search')
             if status:
-                query = query.filter(FoodRequest.status.ilike(f'%{status}%'))
+                query = query.filter(FoodRequest.status == status.strip().title())
             if request_type:
-                query = query.filter(FoodRequest.request_type.ilike(f'%{request_type}%'))
+                query = query.filter(FoodRequest.request_type == request_type.strip().title())
+            if search and search.strip():
+                query = query.filter(_search_filter(FoodRequest, FoodRequest.description, search))
             requests_data = query.all()
             return jsonify([r.to_dict() for r in requests_data])
 
@@ -451,50 +1295,566 @@ def create_app():
         db.session.commit()
         return jsonify({'status': 'ok', 'request': req.to_dict()})
 
-    @app.route('/api/analytics', methods=['GET'])
-    def api_analytics():
-        total_wasted = db.session.query(db.func.sum(Wastage.quantity)).scalar() or 0
-        total_donated = db.session.query(db.func.sum(Donation.quantity)).scalar() or 0
-        total_inventory = db.session.query(db.func.sum(Inventory.quantity)).scalar() or 0
-        remaining_inventory = db.session.query(db.func.sum(Inventory.quantity_remaining)).scalar() or 0
+    def _matching_options(data):
+        """Validate matching parameters; returns ``(options, error)``."""
+        max_distance_km = _parse_float(data.get('max_distance_km'))
+        if max_distance_km is not None and max_distance_km <= 0:
+            return None, ('Max distance must be greater than zero.', 400)
+        request_ids = data.get('request_ids')
+        inventory_ids = data.get('inventory_ids')
+        for ids in (request_ids, inventory_ids):
+            if ids is not None and not isinstance(ids, list):
+                return None, ('Ids must be given as a list.', 400)
+        return {'max_distance_km': max_distance_km, 'request_ids': request_ids,
+                'inventory_ids': inventory_ids, 'apply': bool(data.get('apply'))}, None
+
+    def _run_matching(max_distance_km=None, request_ids=None, inventory_ids=None,
+                      apply=False):
+        request_query = (db.session.query(
+                FoodRequest.id, FoodRequest.request_type,
+                FoodRequest.quantity_needed.label('quantity'), FoodRequest.urgency,
+                FoodRequest.needed_by, NGO.latitude, NGO.longitude)
+            .outerjoin(NGO, NGO.id == FoodRequest.ngo_id)
+            .filter(FoodRequest.status == 'Pending'))
+        if request_ids is not None:
+            request_query = request_query.filter(FoodRequest.id.in_(request_ids))
+        item_query = (db.session.query(
+                Inventory.id, Inventory.category, Inventory.quantity_remaining,
+                Inventory.platform_id, Inventory.date_prepared,
+                FoodPlatform.latitude, FoodPlatform.longitude)
+            .outerjoin(FoodPlatform, FoodPlatform.id == Inventory.platform_id)
+            .filter(Inventory.status == 'Available', Inventory.quantity_remaining > 0))
+        if inventory_ids is not None:
+            item_query = item_query.filter(Inventory.id.in_(inventory_ids))
+
+        assignments = match(
+            [row._asdict() for row in request_query],
+            [row._asdict() for row in item_query],
+            max_distance_km=max_distance_km,
+        )
+
+        claims = []
+        if apply:
+            # Each request is claimed by the platform supplying most of it,
+            # for the quantity that platform supplies; the full split is
+            # returned. Inventory is not reserved (see api_matching).
+            shares = {}
+            for assignment in assignments:
+                if assignment['platform_id'] is None:
+                    continue
+                per_platform = shares.setdefault(assignment['request_id'], {})
+                per_platform[assignment['platform_id']] = (
+                    per_platform.get(assignment['platform_id'], 0) + assignment['quantity'])
+            for req_id, per_platform in shares.items():
+                platform_id = max(per_platform, key=per_platform.get)
+                claims.append({
+                    'request_id': req_id, 'platform_id': platform_id,
+                    'quantity': per_platform[platform_id],
+                    'platforms': [{'platform_id': pid, 'quantity': quantity}
+                                  for pid, quantity in per_platform.items()],
+                })
+            if claims:
+                now = datetime.utcnow()
+                db.session.execute(db.update(FoodRequest), [
+                    {'id': claim['request_id'], 'claimed_platform_id': claim['platform_id'],
+                     'claimed_quantity': claim['quantity'], 'claimed_at': now,
+                     'status': 'Claimed'}
+                    for claim in claims
+                ])
+                db.session.commit()
+
+        return {
+            'assignments': assignments,
+            'matched_requests': len({a['request_id'] for a in assignments}),
+            'applied': len(claims),
+            'claims': claims,
+        }
+
+    @app.route('/api/matching', methods=['POST'])
+    def api_matching():
+        """Match pending food requests to available inventory.
+
+        Optional ``request_ids``/``inventory_ids`` restrict the run (pass the
+        ids of newly created inventory for an incremental re-match),
+        ``max_distance_km`` caps the pickup distance and ``apply`` records
+        the claims on the matched requests.
+
+        A claim names the platform supplying most of a request and the
+        quantity it supplies; ``claims`` lists every platform's share.
+        Applying does not reserve or decrement inventory: stock matched
+        here stays Available, and a later run (incremental ones included)
+        can match it to other requests. Donate it to commit it.
+        """
+        options, error = _matching_options(request.get_json(silent=True) or {})
+        if error:
+            return _json_error(*error)
+        return jsonify({'status': 'ok', **_run_matching(**options)})
+
+    @app.route('/api/food-platforms/<int:platform_id>/route', methods=['GET'])
+    def api_platform_route(platform_id):
+        """Order the pickup stops of the requests a platform has claimed.
+
+        Defaults to every request in Claimed status; ``request_ids`` (comma
+        separated) picks some of the platform's claimed requests instead.
+        ``start`` (ISO datetime, default now, UTC) and ``speed_kmh`` drive
+        the schedule, which tries to reach each NGO before the end of the
+        request's ``needed_by`` day; ``round_trip=1`` returns to the
+        platform. Requests whose NGO has no location are listed under
+        ``unrouted``.
+        """
+        platform = db.session.get(FoodPlatform, platform_id)
+        if platform is None:
+            return _json_error('Food platform not found.', 404)
+        if platform.latitude is None or platform.longitude is None:
+            return _json_error('Food platform has no location.', 409)
+        start = request.args.get('start')
+        try:
+            start = datetime.fromisoformat(start) if start else datetime.utcnow()
+        except ValueError:
+            return _json_error('Start must be an ISO datetime.')
+        if start.tzinfo is not None:
+            start = start.astimezone(timezone.utc).replace(tzinfo=None)
+        speed_kmh = _parse_float(request.args.get('speed_kmh', app.config['ROUTE_SPEED_KMH']))
+        if speed_kmh is None or speed_kmh <= 0:
+            return _json_error('Speed must be greater than zero.')
+        round_trip = request.args.get('round_trip', '').lower() in ('1', 'true', 'yes')
+
+        query = (db.session.query(
+                FoodRequest.id, FoodRequest.ngo_id, FoodRequest.needed_by,
+                FoodRequest.urgency, NGO.name, NGO.latitude, NGO.longitude)
+            .outerjoin(NGO, NGO.id == FoodRequest.ngo_id)
+            .filter(FoodRequest.claimed_platform_id == platform.id)
+            .order_by(FoodRequest.id))
+        request_ids = request.args.get('request_ids')
+        if request_ids:
+            request_ids = {_parse_int(part, None) for part in request_ids.split(',')}
+            if None in request_ids:
+                return _json_error('Request ids must be integers.')
+            query = query.filter(FoodRequest.id.in_(request_ids))
+        else:
+            query = query.filter(FoodRequest.status == 'Claimed')
+        rows = query.all()
+        if request_ids and len(rows) != len(request_ids):
+            missing = sorted(request_ids - {row.id for row in rows})
+            return _json_error(
+                f"Requests not claimed by this platform: {', '.join(map(str, missing))}.")
+        located = [row for row in rows if row.latitude is not None and row.longitude is not None]
+        if len(located) > MAX_ROUTE_STOPS:
+            return _json_error(f'A route can have at most {MAX_ROUTE_STOPS} stops.')
+
+        # Requests are due by the end of their needed_by day.
+        deadlines = [
+            (datetime.combine(row.needed_by + timedelta(days=1), datetime.min.time())
+             - start).total_seconds() / 3600 if row.needed_by else float('inf')
+            for row in located
+        ]
+        service_hours = app.config['ROUTE_STOP_MINUTES'] / 60
+        stops, total_km, finish = [], 0.0, start
+        if located:
+            order, legs, arrivals = plan_route(
+                (platform.latitude, platform.longitude),
+                [row.latitude for row in located], [row.longitude for row in located],
+                deadlines, speed_kmh, service_hours, round_trip)
+            for position, leg_km, arrival in zip(order.tolist(), legs.tolist(),
+                                                 arrivals.tolist()):
+                row = located[position]
+                stops.append({
+                    'request_id': row.id,
+                    'ngo_id': row.ngo_id,
+                    'ngo_name': row.name,
+                    'latitude': row.latitude,
+                    'longitude': row.longitude,
+                    'urgency': row.urgency,
+                    'needed_by': row.needed_by.isoformat() if row.needed_by else None,
+                    'leg_km': round(leg_km, 3),
+                    'arrival': (start + timedelta(hours=arrival)).isoformat(timespec='seconds'),
+                    'late': arrival > deadlines[position],
+                })
+            total_km = float(legs.sum())
+            finish_hours = arrivals[-1] if round_trip else arrivals[-1] + service_hours
+            finish = start + timedelta(hours=float(finish_hours))
         return jsonify({
-            'total_wasted': float(total_wasted),
-            'total_donated': float(total_donated),
-            'total_inventory': float(total_inventory),
-            'total_remaining': float(remaining_inventory)
+            'platform_id': platform.id,
+            'start': start.isoformat(timespec='seconds'),
+            'finish': finish.isoformat(timespec='seconds'),
+            'round_trip': round_trip,
+            'total_km': round(total_km, 3),
+            'return_km': round(float(legs[-1]), 3) if located and round_trip else None,
+            'late_stops': sum(stop['late'] for stop in stops),
+            'stops': stops,
+            'unrouted': [row.id for row in rows if row.latitude is None or row.longitude is None],
         })
 
+    @app.route('/api/analytics', methods=['GET'])
+    @_conditional(*ANALYTICS_TABLES)
+    def api_analytics():
+        # Maintained by triggers on SQLite; other backends aggregate on demand.
+        totals = db.session.get(AnalyticsTotals, 1)
+        if totals is None:
+            return jsonify(_compute_totals())
+        return jsonify({key: float(getattr(totals, key)) for key in TOTALS_SOURCES})
+
     @app.route('/api/analytics/trends', methods=['GET'])
+    @_conditional(*ANALYTICS_TABLES)
     def api_analytics_trends():
         days = _parse_int(request.args.get('days', 7), 7)
-        days = max(1, min(days, 30))
+        days = max(1, min(days, MAX_TREND_DAYS))
         start_date = datetime.utcnow().date() - timedelta(days=days - 1)
-
-        def daily_totals(date_column, quantity_column):
-            rows = (db.session.query(db.func.date(date_column).label('day'),
-                                     db.func.sum(quantity_column))
-                    .filter(date_column >= start_date)
-                    .group_by('day')
-                    .order_by('day')
-                    .all())
-            totals = {str(row.day): float(row[1]) for row in rows if row[0]}
-            return totals
-
-        wasted = daily_totals(Wastage.logged_at, Wastage.quantity)
-        donated = daily_totals(Donation.donated_at, Donation.quantity)
-        produced = daily_totals(Inventory.date_prepared, Inventory.quantity)
-
-        labels = [
-            (start_date + timedelta(days=i)).isoformat()
-            for i in range(days)
-        ]
+        category = (request.args.get('category') or '').strip().title()
+        platform_id = request.args.get('platform_id')
+        if platform_id:
+            platform_id = _parse_int(platform_id, None)
+            if platform_id is None:
+                return _json_error('Platform ID must be an integer.')
+        breakdown = request.args.get('breakdown') or None
+        if breakdown not in (None, 'category', 'platform'):
+            return _json_error('Breakdown must be category or platform.')
+
+        # Maintained by triggers on SQLite; other backends aggregate on demand.
+        # Rows are (day, breakdown key or None, *measures).
+        if db.engine.dialect.name == 'sqlite':
+            # Summed per day (and breakdown key) in SQL, so the rows fetched
+            # do not grow with the number of platforms and categories.
+            rollup = DailyRollup.__table__
+            key = rollup.c[BREAKDOWN_COLUMNS[breakdown]] if breakdown else db.null()
+            query = (db.select(rollup.c.day, key,
+                               *(db.func.sum(rollup.c[m]) for m in ROLLUP_MEASURES))
+                     .where(rollup.c.day >= start_date)
+                     .group_by(rollup.c.day, *([key] if breakdown else [])))
+            if category:
+                query = query.where(rollup.c.category == category)
+            if platform_id is not None:
+                query = query.where(rollup.c.platform_id == platform_id)
+            rows = db.session.execute(query).all()
+        else:
+            rows = [
+                (date.fromisoformat(day),
+                 {'category': row_category, 'platform': row_platform}.get(breakdown),
+                 *(values[m] for m in ROLLUP_MEASURES))
+                for (day, row_category, row_platform), values
+                in _rollup_from_source(start_date).items()
+                if (not category or row_category == category)
+                and (platform_id is None or row_platform == platform_id)
+            ]
+
+        # One (days, measures) array per breakdown key, filled in one pass.
+        position = {start_date + timedelta(days=i): i for i in range(days)}
+        keys, cells, values = {}, [], []
+        for day, key, *measures in rows:
+            column = position.get(day)
+            if column is not None:
+                cells.append((keys.setdefault(key, len(keys)), column))
+                values.append(measures)
+        series = np.zeros((len(keys), days, len(ROLLUP_MEASURES)))
+        if cells:
+            np.add.at(series, tuple(np.array(cells).T), np.array(values, dtype=float))
+
+        def as_lists(per_day):
+            # Days without rows stay a plain 0, which keeps responses small.
+            return {measure: [value or 0 for value in per_day[:, i].tolist()]
+                    for i, measure in enumerate(ROLLUP_MEASURES)}
+
+        labels = [day.isoformat() for day in position]
+        overall = as_lists(series.sum(axis=0))
+        if breakdown is None:
+            return jsonify({'labels': labels, **overall})
         return jsonify({
             'labels': labels,
-            'wasted': [wasted.get(label, 0) for label in labels],
-            'donated': [donated.get(label, 0) for label in labels],
-            'produced': [produced.get(label, 0) for label in labels]
+            **overall,
+            'breakdown': {str(key): as_lists(series[i]) for key, i in keys.items()}
         })
 
+    # Forecasts only use complete days, so they are cached for the day.
+    forecast_cache = VersionedCache(maxsize=2 * MAX_FORECAST_DAYS, ttl=24 * 3600)
+    app.forecast_cache = forecast_cache
+
+    def _forecast_series(kind, start, length):
+        """Daily series per entity, read with one query.
+
+        Returns ``(ids, {measure: matrix})``; platform series come from the
+        daily rollups (so archived history counts), NGO demand from the
+        quantity of requests created each day.
+        """
+        end = start + timedelta(days=length - 1)
+        on_sqlite = db.engine.dialect.name == 'sqlite'
+
+        def offset(day):
+            return db.cast(db.func.julianday(day) - db.func.julianday(start.isoformat()),
+                           db.Integer)
+
+        if kind == 'platform':
+            if on_sqlite:
+                # Table columns skip ORM row loading. One row per (day,
+                # category, platform); daily_matrix adds up the categories,
+                # which is cheaper than a GROUP BY.
+                rollup = DailyRollup.__table__
+                rows = db.session.execute(
+                    db.select(rollup.c.platform_id, offset(rollup.c.day),
+                              rollup.c.wasted, rollup.c.produced)
+                    .where(rollup.c.day.between(start, end),
+                           rollup.c.platform_id != 0)).all()
+            else:
+                rows = [(platform, (date.fromisoformat(day) - start).days,
+                         values['wasted'], values['produced'])
+                        for (day, _, platform), values in _rollup_from_source(start).items()
+                        if platform]
+        else:
+            food_request = FoodRequest.__table__
+            day = db.func.date(food_request.c.created_at)
+            rows = db.session.execute(
+                db.select(food_request.c.ngo_id, offset(day) if on_sqlite else day,
+                          db.func.sum(food_request.c.quantity_needed))
+                .where(food_request.c.created_at >= start,
+                       food_request.c.created_at < end + timedelta(days=1))
+                .group_by(food_request.c.ngo_id, day)).all()
+            if not on_sqlite:
+                rows = [(ngo_id, (date.fromisoformat(str(d)) - start).days, quantity)
+                        for ngo_id, d, quantity in rows]
+
+        measures = FORECAST_MEASURES[kind]
+        entity_ids, offsets, *columns = list(zip(*rows)) or [()] * (2 + len(measures))
+        series = {}
+        for measure, values in zip(measures, columns):
+            ids, series[measure] = daily_matrix(entity_ids, offsets, values, length)
+        return ids, series
+
+    def _forecasts(kind, history_days):
+        """Forecasts for tomorrow from the ``history_days`` days before today.
+
+        Returns ``(target, start, ids, {measure: {model: array}})``.
+        """
+        today = datetime.utcnow().date()
+        target, start = today + timedelta(days=1), today - timedelta(days=history_days)
+
+        def build():
+            ids, series = _forecast_series(kind, start, history_days)
+            return ids, {measure: forecast(matrix, start, target)
+                         for measure, matrix in series.items()}
+
+        ids, results = forecast_cache.get(f'{kind}:{history_days}', target, build)
+        return target, start, ids, results
+
+    @app.route('/api/analytics/forecast', methods=['GET'])
+    def api_analytics_forecast():
+        """Tomorrow's surplus per food platform or demand per NGO.
+
+        ``kind`` is ``platform`` (surplus and production, from the daily
+        rollups) or ``ngo`` (requested quantity). Every entity with history
+        in the last ``history_days`` complete days is fitted at once (see
+        forecast.py) and the result is cached for the day. ``ids`` (comma
+        separated) picks entities; otherwise the ``limit`` largest
+        forecasts are returned.
+        """
+        kind = request.args.get('kind', 'platform')
+        if kind not in FORECAST_MEASURES:
+            return _json_error('Kind must be platform or ngo.')
+        history_days = _parse_int(request.args.get('history_days', DEFAULT_FORECAST_DAYS), None)
+        if history_days is None or not 7 <= history_days <= MAX_FORECAST_DAYS:
+            return _json_error(f'history_days must be between 7 and {MAX_FORECAST_DAYS}.')
+        limit = _parse_int(request.args.get('limit', DEFAULT_PAGE_SIZE), DEFAULT_PAGE_SIZE)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        wanted = request.args.get('ids')
+        if wanted:
+            wanted = [_parse_int(part, None) for part in wanted.split(',')]
+            if None in wanted:
+                return _json_error('Ids must be integers.')
+
+        target, start, ids, results = _forecasts(kind, history_days)
+        measures = FORECAST_MEASURES[kind]
+        positions = np.flatnonzero(np.isin(ids, wanted)) if wanted else np.arange(len(ids))
+        ranking = results[measures[0]]['forecast'][positions]
+        positions = positions[np.argsort(-ranking, kind='stable')][:limit]
+        names = {e['id']: e['name']
+                 for e in (_all_platforms() if kind == 'platform' else _all_ngos())}
+        return jsonify({
+            'date': target.isoformat(),
+            'kind': kind,
+            'history': {'start': start.isoformat(),
+                        'end': (target - timedelta(days=2)).isoformat()},
+            'entities': len(ids),
+            'forecasts': [
+                {'id': int(ids[position]), 'name': names.get(int(ids[position])),
+                 **{measure: {model: round(float(values[position]), 3)
+                              for model, values in results[measure].items()}
+                    for measure in measures}}
+                for position in positions.tolist()
+            ],
+        })
+
+    export_sources = {
+        'inventory': (Inventory, Inventory.date_prepared),
+        'donations': (Donation, Donation.donated_at),
+        'wastage': (Wastage, Wastage.logged_at),
+        'food-requests': (FoodRequest, FoodRequest.created_at),
+    }
+
+    def _export_statement(source, start=None, end=None):
+        """Build the export query; returns ``((statement, columns), error)``.
+
+        ``start``/``end`` (ISO dates, inclusive) filter on the table's date
+        column.
+        """
+        if source not in export_sources:
+            return None, ('Unknown export source.', 404)
+        model, date_column = export_sources[source]
+        table = model.__table__
+        start_date = end_date = None
+        if start:
+            start_date = _parse_date(start)
+            if not start_date:
+                return None, ('Invalid start date.', 400)
+        if end:
+            end_date = _parse_date(end)
+            if not end_date:
+                return None, ('Invalid end date.', 400)
+
+        def in_range(statement, column):
+            if start_date:
+                statement = statement.where(column >= start_date)
+            if end_date:
+                statement = statement.where(column < end_date + timedelta(days=1))
+            return statement
+
+        columns = [column.name for column in table.columns]
+        statement = in_range(db.select(table), date_column)
+        if table.name in archived:
+            # Archived rows first in id order; SQLite merges the two sorted
+            # halves instead of sorting the union.
+            cold = archived[table.name]
+            cold_rows = in_range(db.select(*(cold.c[name] for name in columns)),
+                                 cold.c[date_column.name]).where(_archived_only(table.name))
+            return (db.union_all(cold_rows, statement).order_by(db.literal_column('id')),
+                    columns), None
+        return (statement.order_by(table.c.id), columns), None
+
+    def _export_chunks(statement, columns, export_format):
+        """Yield the export as text chunks; rows are fetched in batches."""
+        result = db.session.execute(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+        for batch in result.partitions():
+            if export_format == 'csv':
+                writer.writerows(
+                    [value.isoformat() if isinstance(value, date) else value
+                     for value in row]
+                    for row in batch
+                )
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield ''.join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default) + '\n'
+                    for row in batch
+                )
+        if export_format == 'csv' and buffer.tell():
+            yield buffer.getvalue()
+        result.close()
+
+    @app.route('/api/export/<source>', methods=['GET'])
+    def api_export(source):
+        """Stream a whole table as NDJSON (default) or CSV.
+
+        ``start``/``end`` (ISO dates, inclusive) filter on the table's date
+        column. Rows are fetched in batches so memory stays flat.
+        """
+        if source not in export_sources:
+            return _json_error('Unknown export source.', 404)
+        export_format = (request.args.get('format') or 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return _json_error('Format must be ndjson or csv.')
+        query, error = _export_statement(source, request.args.get('start'),
+                                         request.args.get('end'))
+        if error:
+            return _json_error(*error)
+
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = Response(stream_with_context(_export_chunks(*query, export_format)),
+                            mimetype=mimetype)
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename={source}.{export_format}')
+        return response
+
+    @app.route('/api/metrics', methods=['GET'])
+    def api_metrics():
+        cache_stats = reference_cache.stats()
+        extra = []
+        for kind in ('hits', 'misses'):
+            name = f'foodwise_reference_cache_{kind}_total'
+            extra += [f'# HELP {name} Reference data cache {kind}.',
+                      f'# TYPE {name} counter',
+                      f'{name} {cache_stats[kind]}']
+        extra += ['# HELP foodwise_event_subscribers Open /api/events streams.',
+                  '# TYPE foodwise_event_subscribers gauge',
+                  f'foodwise_event_subscribers {event_broker.subscribers}']
+        return Response(request_metrics.render(extra),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    # ------------------ LIVE EVENTS ------------------
+    # Triggers append every inventory, request and donation change to
+    # change_event (SQLite only); the broker tails it once per process and
+    # fans events out to /api/events streams (see events.py).
+
+    change_events = ChangeEvent.__table__
+
+    def _fetch_events(after_id, limit):
+        with app.app_context():
+            engine = db.engines.get(READ_BIND_KEY, db.engine)
+            with engine.connect() as connection:
+                return [tuple(row) for row in connection.execute(
+                    db.select(change_events.c.id, change_events.c.topic,
+                              change_events.c.action, change_events.c.entity_id,
+                              change_events.c.payload)
+                    .where(change_events.c.id > after_id)
+                    .order_by(change_events.c.id).limit(limit))]
+
+    def _latest_event_id():
+        with app.app_context():
+            engine = db.engines.get(READ_BIND_KEY, db.engine)
+            with engine.connect() as connection:
+                return connection.execute(
+                    db.select(db.func.coalesce(db.func.max(change_events.c.id), 0))
+                ).scalar()
+
+    event_broker = EventBroker(_fetch_events, _latest_event_id,
+                               app.config['EVENTS_POLL_SECONDS'])
+    app.event_broker = event_broker
+
+    @app.route('/api/events', methods=['GET'])
+    def api_events():
+        """Stream change events as Server-Sent Events.
+
+        ``topics`` is a comma-separated subset of inventory, food_request,
+        donation and wastage (default: all). Reconnecting clients resume
+        after ``Last-Event-ID`` (or ``after``); new clients start with the
+        next change. Each stream holds a worker while it is open, so pages
+        only subscribe to the standalone server at ``EVENTS_URL``.
+        """
+        topics = parse_topics(request.args.get('topics'))
+        if topics is None:
+            return _json_error('Unknown topic.')
+        after_id = _parse_int(request.headers.get('Last-Event-ID')
+                              or request.args.get('after'), None)
+        heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+
+        def stream():
+            yield f'retry: {RETRY_MS}\n\n'
+            for events in event_broker.subscribe(after_id, heartbeat):
+                frames = ''.join(format_event(e) for e in events if e[1] in topics)
+                yield frames or ': keep-alive\n\n'
+
+        response = Response(stream(), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @app.route('/api/cache/stats', methods=['GET'])
+    def api_cache_stats():
+        return jsonify(reference_cache.stats())
+
     @app.route('/api/health', methods=['GET'])
     def api_health():
         inventory_count = Inventory.query.count()
@@ -505,101 +1865,446 @@ def create_app():
             'ngos': ngo_count
         })
 
+    def _rebuild_analytics():
+        """Recompute the analytics totals and daily rollups from the source tables."""
+        totals = db.session.get(AnalyticsTotals, 1) or AnalyticsTotals(id=1)
+        for key, value in _compute_totals().items():
+            setattr(totals, key, value)
+        db.session.add(totals)
+        DailyRollup.query.delete()
+        db.session.bulk_insert_mappings(DailyRollup, [
+            {'day': date.fromisoformat(day), 'category': category,
+             'platform_id': platform_id, **values}
+            for (day, category, platform_id), values in _rollup_from_source().items()
+        ])
+        # The numbers may change without a write to the source tables, so
+        # bump their versions to retire cached analytics responses.
+        db.session.execute(
+            db.update(TableVersion).where(TableVersion.name.in_(ANALYTICS_TABLES))
+            .values(version=TableVersion.version + 1, updated_at=db.func.now()))
+        db.session.commit()
+        return {key: float(getattr(totals, key)) for key in TOTALS_SOURCES}
+
+    def _archive_history(days=None, batch_size=None, progress=None):
+        """Move donations and wastage older than ``days`` to the archive."""
+        if not archived:
+            raise RuntimeError('Archiving needs a SQLite database file.')
+        days = app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        return archive_rows(db.engine, archived, cutoff,
+                            batch_size or app.config['ARCHIVE_BATCH_SIZE'], progress)
+
+    # ------------------ JOBS ------------------
+    # Handlers for background jobs (see jobs.py), keyed by job kind. Each is
+    # called as handler(params, progress) by a worker process.
+
+    export_dir = app.config['JOB_EXPORT_DIR'] or os.path.join(app.instance_path, 'exports')
+
+    def _bulk_import_job(params, progress):
+        entries = params.get('submissions')
+        if not isinstance(entries, list) or not entries:
+            raise ValueError('Expected a non-empty list of submissions.')
+        inserted, errors = _ingest_submissions(entries, progress)
+        return {'inserted': inserted, 'errors': errors}
+
+    def _export_job(params, progress):
+        export_format = (params.get('format') or 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError('Format must be ndjson or csv.')
+        query, error = _export_statement(params.get('source'), params.get('start'),
+                                         params.get('end'))
+        if error:
+            raise ValueError(error[0])
+        statement, columns = query
+        total = db.session.execute(
+            db.select(db.func.count()).select_from(statement.subquery())).scalar()
+        os.makedirs(export_dir, exist_ok=True)
+        filename = f"{params['source']}-{uuid.uuid4().hex}.{export_format}"
+        with open(os.path.join(export_dir, filename), 'w', newline='') as f:
+            for batches, chunk in enumerate(_export_chunks(statement, columns, export_format), 1):
+                f.write(chunk)
+                if total:
+                    progress(batches * EXPORT_BATCH_SIZE / total)
+            size = f.tell()
+        return {'file': filename, 'format': export_format, 'rows': total, 'bytes': size}
+
+    def _matching_job(params, progress):
+        options, error = _matching_options(params)
+        if error:
+            raise ValueError(error[0])
+        return _run_matching(**options)
+
+    job_handlers = {
+        'bulk_import': _bulk_import_job,
+        'export': _export_job,
+        'analytics_rebuild': lambda params, progress: _rebuild_analytics(),
+        'matching': _matching_job,
+        'expiry_sweep': lambda params, progress: _sweep_expired(progress=progress),
+        'archive': lambda params, progress: _archive_history(
+            _parse_int(params.get('days'), None), progress=progress),
+    }
+    app.job_handlers = job_handlers
+
+    def _job_dict(job):
+        data = job.to_dict()
+        data.pop('params')  # may hold a whole bulk import
+        return data
+
+    @app.route('/api/jobs', methods=['POST'])
+    def api_jobs():
+        """Queue a background job: ``{"kind": ..., "params": {...}}``."""
+        data = request.get_json(silent=True) or {}
+        kind = data.get('kind')
+        if kind not in job_handlers:
+            return _json_error(f"Kind must be one of: {', '.join(sorted(job_handlers))}.")
+        params = data.get('params') or {}
+        if not isinstance(params, dict):
+            return _json_error('Params must be a JSON object.')
+        job = enqueue(db, Job, kind, params)
+        response = jsonify({'status': 'ok', 'job': _job_dict(job)})
+        response.status_code = 202
+        response.headers['Location'] = f'/api/jobs/{job.id}'
+        return response
+
+    @app.route('/api/jobs/<int:job_id>', methods=['GET'])
+    def api_job(job_id):
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return _json_error('Job not found.', 404)
+        return jsonify(_job_dict(job))
+
+    @app.route('/api/jobs/<int:job_id>/download', methods=['GET'])
+    def api_job_download(job_id):
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return _json_error('Job not found.', 404)
+        if job.kind != 'export' or job.status != 'Succeeded':
+            return _json_error('Only finished export jobs have a download.', 409)
+        return send_from_directory(export_dir, job.result['file'], as_attachment=True)
+
+    # ------------------ CLI ------------------
+
+    analytics_cli = AppGroup('analytics', help='Maintain pre-aggregated analytics.')
+    app.cli.add_command(analytics_cli)
+
+    @analytics_cli.command('rebuild')
+    def analytics_rebuild():
+        """Recompute the analytics totals and daily rollups from the source tables."""
+        _rebuild_analytics()
+        click.echo('Analytics totals and daily rollups rebuilt.')
+
+    @analytics_cli.command('verify')
+    def analytics_verify():
+        """Compare the stored totals and daily rollups against the source tables."""
+        totals = db.session.get(AnalyticsTotals, 1)
+        if totals is None:
+            raise click.ClickException('Analytics totals are missing; run "flask analytics rebuild".')
+        drift = {
+            key: (getattr(totals, key), expected)
+            for key, expected in _compute_totals().items()
+            if abs(getattr(totals, key) - expected) > 1e-6
+        }
+        for key, (stored, expected) in drift.items():
+            click.echo(f'{key}: stored {stored} != actual {expected}')
+
+        stored_rollups = {
+            (row.day.isoformat(), row.category, row.platform_id):
+                {m: getattr(row, m) for m in ROLLUP_MEASURES}
+            for row in DailyRollup.query
+        }
+        expected_rollups = _rollup_from_source()
+        zero = dict.fromkeys(ROLLUP_MEASURES, 0.0)
+        for key in stored_rollups.keys() | expected_rollups.keys():
+            stored = stored_rollups.get(key, zero)
+            expected = expected_rollups.get(key, zero)
+            if any(abs(stored[m] - expected[m]) > 1e-6 for m in ROLLUP_MEASURES):
+                drift[key] = (stored, expected)
+                click.echo(f'rollup {key}: stored {stored} != actual {expected}')
+        if drift:
+            raise click.ClickException('Analytics totals are out of date.')
+        click.echo('Analytics totals are consistent.')
+
+    db_cli = AppGroup('db', help='Manage the database schema.')
+    app.cli.add_command(db_cli)
+
+    @db_cli.command('upgrade')
+    def db_upgrade():
+        """Apply pending schema migrations."""
+        if not upgrade(db.engine, db.metadata, echo=click.echo):
+            click.echo('Database schema is up to date.')
+
+    @db_cli.command('status')
+    def db_status():
+        """Show the schema version and pending migrations."""
+        click.echo(f'Schema version {current_version(db.engine)}.')
+        for version, name in pending(db.engine):
+            click.echo(f'Pending migration {version}: {name}')
+
+    inventory_cli = AppGroup('inventory', help='Maintain inventory.')
+    app.cli.add_command(inventory_cli)
+
+    @inventory_cli.command('sweep-expired')
+    @click.option('--batch-size', default=EXPIRY_BATCH_SIZE, show_default=True,
+                  help='Items updated per transaction.')
+    @click.option('--interval', default=0.0, show_default=True,
+                  help='Repeat every INTERVAL seconds (0 runs once).')
+    def inventory_sweep_expired(batch_size, interval):
+        """Mark expired items and log their remaining stock as wastage."""
+        while True:
+            swept = _sweep_expired(batch_size=batch_size)
+            db.session.remove()
+            click.echo(f"Expired {swept['items']} item(s), "
+                       f"{swept['quantity']:g} units logged as wastage.")
+            if interval <= 0:
+                return
+            time.sleep(interval)
+
+    archive_cli = AppGroup('archive', help='Move old history to the archive database.')
+    app.cli.add_command(archive_cli)
+
+    @archive_cli.command('run')
+    @click.option('--days', type=int, default=None,
+                  help='Archive rows older than DAYS (default: ARCHIVE_AFTER_DAYS).')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Rows moved per transaction (default: ARCHIVE_BATCH_SIZE).')
+    def archive_run(days, batch_size):
+        """Move old donations and wastage to the archive database."""
+        try:
+            moved = _archive_history(days, batch_size)
+        except RuntimeError as error:
+            raise click.ClickException(str(error))
+        for name, counts in moved.items():
+            click.echo(f"Archived {counts['rows']} {name} row(s), {counts['quantity']:g} units.")
+
+    @archive_cli.command('status')
+    def archive_status():
+        """Show how many rows are hot and archived."""
+        if not archived:
+            raise click.ClickException('Archiving needs a SQLite database file.')
+        for name, table in archived.items():
+            timestamp = ARCHIVED_TABLES[name][0]
+            hot = db.metadata.tables[name]
+            hot_rows, oldest = db.session.execute(
+                db.select(db.func.count(), db.func.min(hot.c[timestamp]))).one()
+            cold_rows, newest = db.session.execute(
+                db.select(db.func.count(), db.func.max(table.c[timestamp]))).one()
+            click.echo(f'{name}: {hot_rows} hot (oldest {oldest or "-"}), '
+                       f'{cold_rows} archived (newest {newest or "-"})')
+
+    jobs_cli = AppGroup('jobs', help='Run background jobs.')
+    app.cli.add_command(jobs_cli)
+
+    @jobs_cli.command('work')
+    @click.option('--processes', default=1, show_default=True, help='Worker processes.')
+    @click.option('--poll-interval', default=1.0, show_default=True,
+                  help='Seconds to wait when the queue is empty.')
+    @click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+    def jobs_work(processes, poll_interval, burst):
+        """Process queued jobs."""
+        if processes > 1:
+            processed = run_pool(processes, poll_interval, burst)
+        else:
+            processed = work(app, db, poll_interval, burst)
+        click.echo(f'Processed {processed} job(s).')
+
+    events_cli = AppGroup('events', help='Serve the live change feed.')
+    app.cli.add_command(events_cli)
+
+    @events_cli.command('serve')
+    @click.option('--host', default='127.0.0.1', show_default=True)
+    @click.option('--port', default=5001, show_default=True)
+    def events_serve(host, port):
+        """Serve /api/events from an asyncio server (for many idle clients)."""
+        click.echo(f'Serving change events on http://{host}:{port}/api/events')
+        serve_events(_fetch_events, _latest_event_id, host, port,
+                     app.config['EVENTS_POLL_SECONDS'],
+                     app.config['EVENTS_HEARTBEAT_SECONDS'],
+                     app.config['EVENTS_ALLOW_ORIGIN'])
+
     return app
 
 
-def _ensure_schema(food_request_model):
-    """Make sure new columns/tables exist for legacy SQLite DBs."""
-    engine = db.engine
-    inspector = inspect(engine)
-    conn = engine.connect()
-    try:
-        tables = inspector.get_table_names()
-
-        # Inventory column backfills
-        if 'inventory' in tables:
-            inv_columns = {col['name'] for col in inspector.get_columns('inventory')}
-            if 'category' not in inv_columns:
-                conn.execute(text("ALTER TABLE inventory ADD COLUMN category VARCHAR(50) DEFAULT 'Human'"))
-            if 'platform_id' not in inv_columns:
-                conn.execute(text("ALTER TABLE inventory ADD COLUMN platform_id INTEGER"))
-
-        # Food request table + columns
-        if 'food_request' not in tables:
-            food_request_model.__table__.create(engine)
-        else:
-            req_columns = {col['name'] for col in inspector.get_columns('food_request')}
-            if 'claimed_platform_id' not in req_columns:
-                conn.execute(text("ALTER TABLE food_request ADD COLUMN claimed_platform_id INTEGER"))
-            if 'claimed_quantity' not in req_columns:
-                conn.execute(text("ALTER TABLE food_request ADD COLUMN claimed_quantity FLOAT"))
-            if 'claimed_at' not in req_columns:
-                conn.execute(text("ALTER TABLE food_request ADD COLUMN claimed_at DATETIME"))
-    finally:
-        conn.close()
-
-
-def _seed_reference_data(app):
-    needs_commit = False
-    if app.NGO.query.count() == 0:
-        ngos = [
-            app.NGO(
-                name='Helping Hands',
-                address='Near Central Park, New Delhi',
-                latitude=28.6139,
-                longitude=77.2090,
-            ),
-            app.NGO(
-                name='Food for All',
-                address='MG Road, Bangalore',
-                latitude=12.9716,
-                longitude=77.5946,
-            ),
-            app.NGO(
-                name='Community Kitchen',
-                address='Marine Drive, Mumbai',
-                latitude=18.9407,
-                longitude=72.8353,
-            ),
-        ]
-        db.session.add_all(ngos)
-        needs_commit = True
-
-    if app.FoodPlatform.query.count() == 0:
-        platforms = [
-            app.FoodPlatform(
-                name='FoodWise Kitchen',
-                address='Central Food Hub, New Delhi',
-                latitude=28.6139,
-                longitude=77.2090,
-                contact='foodwise@example.com',
-                description='Main kitchen facility for food preparation and distribution',
-            ),
-            app.FoodPlatform(
-                name='Community Food Center',
-                address='Downtown Location, Bangalore',
-                latitude=12.9352,
-                longitude=77.6245,
-                contact='community@example.com',
-                description='Local food preparation and donation center',
-            ),
-        ]
-        db.session.add_all(platforms)
-        needs_commit = True
+def _is_file_sqlite(url):
+    return url.startswith('sqlite:') and url not in ('sqlite://', 'sqlite:///:memory:')
+
+
+def _configure_engines(app):
+    """Size the connection pools and add the read-only bind for SQLite."""
+    config = app.config
+    url = config['SQLALCHEMY_DATABASE_URI']
+    if not _is_file_sqlite(url):
+        return
+    pool_options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    for key, value in pool_options.items():
+        config['SQLALCHEMY_ENGINE_OPTIONS'].setdefault(key, value)
+    if config['DB_READ_POOL_SIZE'] > 0:
+        binds = config.setdefault('SQLALCHEMY_BINDS', {})
+        binds.setdefault(READ_BIND_KEY, {
+            'url': url,
+            **pool_options,
+            'pool_size': config['DB_READ_POOL_SIZE'],
+        })
 
-    if needs_commit:
-        db.session.commit()
-        print("✅ Database initialized with NGOs and Food Platforms!")
+
+def _install_sqlite_pragmas(app):
+    """Apply the SQLITE_* settings to every new pooled connection."""
+    config = app.config
+    if not config['SQLITE_TUNING']:
+        return
+
+    with app.app_context():
+        engines = dict(db.engines)
+
+    for bind_key, engine in engines.items():
+        if engine.dialect.name != 'sqlite':
+            continue
+
+        def set_pragmas(dbapi_connection, connection_record,
+                        read_only=bind_key == READ_BIND_KEY,
+                        file_backed=_is_file_sqlite(str(engine.url))):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+            if file_backed:
+                cursor.execute(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+            cursor.execute(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+            cursor.execute(f"PRAGMA cache_size = -{int(config['SQLITE_CACHE_SIZE_KB'])}")
+            cursor.execute(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+            if read_only:
+                cursor.execute('PRAGMA query_only = ON')
+            cursor.close()
+
+        event.listen(engine, 'connect', set_pragmas)
+
+
+def _install_archive(app):
+    """Attach the archive database to every connection of a SQLite file.
+
+    Returns the archive tables keyed by source table, or ``{}`` when the
+    database is not a SQLite file.
+    """
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    if not _is_file_sqlite(url):
+        return {}
+    path = app.config['ARCHIVE_DATABASE_PATH']
+    if not path:
+        root, _ = os.path.splitext(make_url(url).database)
+        path = f'{root}-archive.db'
+    tables = archive_tables(db.metadata)
+    ddl = archive_ddl(tables)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def attach_archive(dbapi_connection, connection_record):
+        attach(dbapi_connection, path, ddl)
+
+    for engine in engines:
+        # Ahead of the pragma listener, which may make the connection query-only.
+        event.listen(engine, 'connect', attach_archive, insert=True)
+    return tables
+
+
+class _TimedCursor:
+    """DBAPI cursor proxy passing the time spent fetching to ``fetched``.
+
+    Single-row fetches are added up and reported when the rows run out or
+    the cursor closes, keeping the per-row overhead to two clock reads.
+    """
+
+    __slots__ = ('_cursor', '_fetched', '_pending')
+
+    def __init__(self, cursor, fetched):
+        self._cursor = cursor
+        self._fetched = fetched
+        self._pending = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _report(self):
+        if self._pending:
+            self._fetched(self._pending)
+            self._pending = 0.0
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._pending += time.perf_counter() - started
+        if row is None:
+            self._report()
+        return row
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.fetchmany(*args)
+        finally:
+            self._pending += time.perf_counter() - started
+            self._report()
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return self._cursor.fetchall()
+        finally:
+            self._pending += time.perf_counter() - started
+            self._report()
+
+    def close(self):
+        self._report()
+        self._cursor.close()
+
+
+def _install_query_metrics(app, record):
+    """Time every SQL statement on all engines and pass it to ``record``.
+
+    ``record(statement, seconds)`` is called once the statement has executed
+    and ``record(statement, seconds, total)`` for each later fetch of its
+    rows (SQLite does most of a query's work while stepping through rows).
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        seconds = time.perf_counter() - started
+        record(statement, seconds)
+        if context is not None and cursor.description is not None:
+            # The result reads rows through context.cursor, set up after
+            # this event; time its fetches too.
+            total = [seconds]
+
+            def fetched(fetch_seconds):
+                total[0] += fetch_seconds
+                record(statement, fetch_seconds, total[0])
+
+            context.cursor = _TimedCursor(cursor, fetched)
+
+    def handle_error(context):
+        started = context.connection.info.get('query_started') if context.connection else None
+        if started:
+            started.pop()
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(engine, 'handle_error', handle_error)
 
 
 if __name__ == '__main__':
     app = create_app()
     os.makedirs(app.instance_path, exist_ok=True)
 
-    # Initialize database inside app context
+    # Bring the database up to date (a single query when it already is)
     with app.app_context():
-        db.create_all()
-        _ensure_schema(app.FoodRequest)
-        _seed_reference_data(app)
+        upgrade(db.engine, db.metadata, echo=print)
 
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""Cold storage for old donation and wastage rows.
+
+Every SQLite connection attaches a second database file as ``archive``
+holding copies of the ``donation`` and ``wastage`` tables. ``archive_rows``
+moves rows older than a cutoff there in batches, which keeps the hot tables
+(and their indexes) small. Archived rows also store the category and
+platform of their inventory item, frozen at archive time.
+
+The delete triggers subtract archived rows from ``analytics_totals`` and
+``daily_rollup`` as if they were gone, so the same transaction adds them
+back first; totals and trends keep covering all history. Readers that need
+every row (exports, ``analytics verify``/``rebuild``) union both tables.
+
+SQLite commits attached WAL databases one at a time, not atomically, so a
+batch is copied in one transaction and deleted in the next. A crash in
+between leaves rows in both places: readers skip archived rows still
+present in the hot table, and the next run copies them again (the copy
+replaces by id) and deletes them.
+"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, bindparam, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+ARCHIVE_SCHEMA = 'archive'
+
+ARCHIVED_TABLES = {
+    # table: (timestamp column, analytics_totals column, daily_rollup measure)
+    'donation': ('donated_at', 'total_donated', 'donated'),
+    'wastage': ('logged_at', 'total_wasted', 'wasted'),
+}
+
+
+def archive_tables(metadata):
+    """Archive copies of the archived tables in ``metadata``, keyed by name."""
+    archive_metadata = MetaData(schema=ARCHIVE_SCHEMA)
+    tables = {}
+    for name, (timestamp, _, _) in ARCHIVED_TABLES.items():
+        source = metadata.tables[name]
+        table = Table(
+            name, archive_metadata,
+            *(Column(column.name, column.type, primary_key=column.primary_key)
+              for column in source.columns),
+            Column('category', String(50)),
+            Column('platform_id', Integer),
+        )
+        Index(f'ix_{name}_{timestamp}', table.c[timestamp])
+        tables[name] = table
+    return tables
+
+
+def archive_ddl(tables):
+    """``CREATE ... IF NOT EXISTS`` statements for the archive tables."""
+    dialect = sqlite.dialect()
+    statements = []
+    for table in tables.values():
+        statements.append(str(CreateTable(table, if_not_exists=True).compile(dialect=dialect)))
+        statements += [str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+                       for index in table.indexes]
+    return statements
+
+
+def attach(dbapi_connection, path, ddl):
+    """Attach the archive at ``path`` to a new connection and create its tables."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (path,))
+    for statement in ddl:
+        cursor.execute(statement)
+    cursor.close()
+
+
+def _copy(connection, name, archived, ids):
+    columns = ', '.join(column.name for column in archived.columns
+                        if column.name not in ('category', 'platform_id'))
+    selected = ', '.join(f'source.{column.name}' for column in archived.columns
+                         if column.name not in ('category', 'platform_id'))
+    connection.execute(text(
+        f"INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.{name} ({columns}, category, platform_id) "
+        f"SELECT {selected}, coalesce(i.category, 'Human'), coalesce(i.platform_id, 0) "
+        f"FROM main.{name} AS source LEFT JOIN main.inventory AS i ON i.id = source.inventory_id "
+        f"WHERE source.id IN :ids"
+    ).bindparams(bindparam('ids', expanding=True)), {'ids': ids})
+
+
+def _remove(connection, name, ids):
+    """Delete archived rows from the hot table, keeping totals and rollups."""
+    timestamp, total, measure = ARCHIVED_TABLES[name]
+    params = {'ids': ids}
+    expanding = bindparam('ids', expanding=True)
+    quantity = connection.execute(text(
+        f'SELECT coalesce(sum(quantity), 0) FROM main.{name} WHERE id IN :ids'
+    ).bindparams(expanding), params).scalar()
+    connection.execute(text(
+        f'UPDATE analytics_totals SET {total} = {total} + :quantity WHERE id = 1'
+    ), {'quantity': quantity})
+    # Same buckets as the rollup triggers use (see rollup_ddl in models.py).
+    connection.execute(text(
+        f"INSERT INTO daily_rollup (day, category, platform_id, {measure}) "
+        f"SELECT date(source.{timestamp}), coalesce(i.category, 'Human'), "
+        f"coalesce(i.platform_id, 0), sum(source.quantity) "
+        f"FROM main.{name} AS source LEFT JOIN main.inventory AS i ON i.id = source.inventory_id "
+        f"WHERE source.id IN :ids AND source.{timestamp} IS NOT NULL "
+        f"GROUP BY 1, 2, 3 "
+        f"ON CONFLICT (day, category, platform_id) "
+        f"DO UPDATE SET {measure} = {measure} + excluded.{measure}"
+    ).bindparams(expanding), params)
+    connection.execute(text(
+        f'DELETE FROM main.{name} WHERE id IN :ids').bindparams(expanding), params)
+    return quantity
+
+
+def archive_rows(engine, tables, cutoff, batch_size=1000, progress=None):
+    """Move rows older than ``cutoff`` (a datetime) into the archive.
+
+    Returns ``{table: {'rows': ..., 'quantity': ...}}``. The newest row of a
+    table is never archived: SQLite would hand its id out again, and ids
+    must stay unique across the hot and archive tables.
+    """
+    moved = {}
+    for position, (name, (timestamp, _, _)) in enumerate(ARCHIVED_TABLES.items()):
+        rows = quantity = 0
+        while True:
+            with engine.begin() as connection:
+                ids = connection.execute(text(
+                    f'SELECT id FROM main.{name} WHERE {timestamp} < :cutoff '
+                    f'AND id < (SELECT max(id) FROM main.{name}) '
+                    f'ORDER BY {timestamp} LIMIT :limit'
+                ).bindparams(bindparam('cutoff', type_=DateTime)),
+                    {'cutoff': cutoff, 'limit': batch_size}).scalars().all()
+                if ids:
+                    _copy(connection, name, tables[name], ids)
+            if not ids:
+                break
+            with engine.begin() as connection:
+                quantity += _remove(connection, name, ids)
+            rows += len(ids)
+        moved[name] = {'rows': rows, 'quantity': float(quantity)}
+        if progress is not None:
+            progress((position + 1) / len(ARCHIVED_TABLES))
+    return moved
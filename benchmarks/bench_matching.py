@@ -0,0 +1,63 @@
+"""Benchmark the request/inventory matching engine on synthetic data.
+
+Usage: python benchmarks/bench_matching.py [--requests 50000] [--items 100000]
+"""
+import argparse
+from datetime import date, timedelta
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching import match  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50_000)
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--platforms', type=int, default=2_000)
+    parser.add_argument('--max-distance-km', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    platforms = [(rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0))
+                 for _ in range(args.platforms)]
+    items = []
+    for item_id in range(args.items):
+        platform_id = rng.randrange(args.platforms)
+        lat, lng = platforms[platform_id]
+        items.append({
+            'id': item_id,
+            'category': rng.choice(['Human', 'Pet']),
+            'quantity_remaining': rng.uniform(1, 20),
+            'platform_id': platform_id,
+            'date_prepared': date(2025, 1, 1) + timedelta(days=rng.randrange(30)),
+            'latitude': lat,
+            'longitude': lng,
+        })
+    requests = [{
+        'id': request_id,
+        'request_type': rng.choice(['Human', 'Pet']),
+        'quantity': rng.uniform(1, 30),
+        'urgency': rng.choice(['Normal', 'High', 'Critical']),
+        'needed_by': None,
+        'latitude': rng.uniform(8.0, 35.0),
+        'longitude': rng.uniform(68.0, 97.0),
+    } for request_id in range(args.requests)]
+
+    started = time.perf_counter()
+    assignments = match(requests, items, max_distance_km=args.max_distance_km)
+    elapsed = time.perf_counter() - started
+
+    matched = {a['request_id'] for a in assignments}
+    print(f'requests={args.requests} items={args.items} platforms={args.platforms}')
+    print(f'assignments={len(assignments)} matched_requests={len(matched)} '
+          f'elapsed={elapsed:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
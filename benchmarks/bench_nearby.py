@@ -0,0 +1,51 @@
+"""Benchmark LocationIndex radius queries over synthetic locations.
+
+Usage: python benchmarks/bench_nearby.py [--points 100000] [--queries 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geo import LocationIndex  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2_000)
+    parser.add_argument('--radius-km', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # Points spread over India's bounding box, roughly like real partners.
+    rng = np.random.default_rng(args.seed)
+    lats = rng.uniform(8.0, 35.0, args.points)
+    lngs = rng.uniform(68.0, 97.0, args.points)
+
+    started = time.perf_counter()
+    index = LocationIndex(np.arange(args.points), lats, lngs)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    query_lats = rng.uniform(8.0, 35.0, args.queries)
+    query_lngs = rng.uniform(68.0, 97.0, args.queries)
+    timings = []
+    matches = 0
+    for lat, lng in zip(query_lats, query_lngs):
+        started = time.perf_counter()
+        matches += len(index.query(lat, lng, args.radius_km, limit=50))
+        timings.append(time.perf_counter() - started)
+
+    timings = np.array(timings) * 1000
+    print(f'points={args.points} radius_km={args.radius_km} build={build_ms:.1f}ms')
+    print(f'queries={args.queries} avg_matches={matches / args.queries:.1f}')
+    print('latency ms: p50={:.3f} p95={:.3f} p99={:.3f} max={:.3f}'.format(
+        *np.percentile(timings, [50, 95, 99]), timings.max()))
+
+
+if __name__ == '__main__':
+    main()
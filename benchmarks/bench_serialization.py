@@ -0,0 +1,92 @@
+"""Compare row serialization before and after the compiled serializers.
+
+Loads synthetic Inventory rows once, then times the old ``to_dict``
+implementation against the compiled per-model serializer, and Flask's
+stdlib JSON provider against the orjson one.
+
+Usage: python benchmarks/bench_serialization.py [--rows 100000] [--repeat 3]
+"""
+import argparse
+from datetime import date, timedelta
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def legacy_to_dict(row):
+    """``BaseModel.to_dict`` as it was before the compiled serializers."""
+    d = {c.name: getattr(row, c.name) for c in row.__table__.columns}
+    for k, v in d.items():
+        if isinstance(v, date):
+            d[k] = v.isoformat()
+    return d
+
+
+def best_rate(func, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(rows / best)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodwise-serialize-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    from flask.json.provider import DefaultJSONProvider
+
+    from app import create_app, db
+    from json_provider import OrjsonProvider
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        start = date(2024, 1, 1)
+        db.session.execute(app.Inventory.__table__.insert(), [
+            {'item_type': f'Batch {i}', 'quantity': float(i % 50),
+             'quantity_remaining': float(i % 50),
+             'date_prepared': start + timedelta(days=i % 365),
+             'status': 'Available', 'category': 'Human'}
+            for i in range(args.rows)
+        ])
+        db.session.commit()
+        rows = app.Inventory.query.all()
+        serialize = app.Inventory.serializer()
+
+        results = {
+            'to_dict (legacy)': best_rate(
+                lambda: [legacy_to_dict(r) for r in rows], len(rows), args.repeat),
+            'to_dict (compiled)': best_rate(
+                lambda: [serialize(r) for r in rows], len(rows), args.repeat),
+        }
+        dicts = [serialize(r) for r in rows]
+        providers = {'stdlib': DefaultJSONProvider(app)}
+        if OrjsonProvider.available:
+            providers['orjson'] = OrjsonProvider(app)
+        for name, provider in providers.items():
+            results[f'dumps ({name})'] = best_rate(
+                lambda: provider.dumps(dicts), len(rows), args.repeat)
+        results['end to end (before)'] = best_rate(
+            lambda: providers['stdlib'].dumps([legacy_to_dict(r) for r in rows]),
+            len(rows), args.repeat)
+        fast = providers.get('orjson', providers['stdlib'])
+        results['end to end (after)'] = best_rate(
+            lambda: fast.dumps([serialize(r) for r in rows]), len(rows), args.repeat)
+
+    print(f'{len(rows)} Inventory rows, best of {args.repeat}')
+    for name, rate in results.items():
+        print(f'  {name:<22} {rate:>12,} rows/s')
+
+
+if __name__ == '__main__':
+    main()
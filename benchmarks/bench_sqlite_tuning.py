@@ -0,0 +1,97 @@
+"""Compare API throughput with and without the SQLite tuning layer.
+
+Each mode gets a fresh database and a pool of worker processes (standing in
+for gunicorn workers) running a mixed read/write workload for a fixed time.
+
+Usage: python benchmarks/bench_sqlite_tuning.py [--workers 8] [--duration 10]
+"""
+import argparse
+from collections import Counter
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = {
+    'baseline': {'SQLITE_TUNING': '0', 'DB_READ_POOL_SIZE': '0'},
+    'tuned': {'SQLITE_TUNING': '1'},
+}
+
+
+def _worker(args):
+    duration, seed = args
+    from app import create_app
+
+    client = create_app().test_client()
+    rng = random.Random(seed)
+    outcomes = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        roll = rng.random()
+        if roll < 0.8:
+            response = client.get('/api/inventory?limit=20')
+            kind = 'read'
+        elif roll < 0.9:
+            response = client.post('/api/inventory', json={
+                'item_type': 'Bench batch', 'quantity': 10})
+            kind = 'write'
+        else:
+            response = client.post('/api/donations', json={
+                'inventory_id': 1, 'ngo_id': 1, 'quantity': 0.01})
+            kind = 'write'
+        status = 'ok' if response.status_code < 300 else 'error'
+        outcomes[f'{kind}_{status}'] += 1
+    return outcomes
+
+
+def run_mode(name, workers, duration):
+    workdir = tempfile.mkdtemp(prefix=f'foodwise-{name}-')
+    env = {'DATABASE_URL': 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+           'SQLITE_TUNING': '1', 'DB_READ_POOL_SIZE': '10', **MODES[name]}
+    os.environ.update(env)
+
+    # Schema setup happens in a child so this process never builds an app.
+    setup = multiprocessing.get_context('spawn').Process(target=_setup)
+    setup.start()
+    setup.join()
+
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        results = pool.map(_worker, [(duration, seed) for seed in range(workers)])
+    outcomes = sum(results, Counter())
+    total_ok = outcomes['read_ok'] + outcomes['write_ok']
+    return {
+        'requests_per_sec': round(total_ok / duration, 1),
+        **dict(outcomes),
+    }
+
+
+def _setup():
+    from app import create_app, db
+    from migrations import upgrade
+
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+        db.session.add(app.Inventory(item_type='Donation stock', quantity=1e9,
+                                     quantity_remaining=1e9))
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    for name in MODES:
+        result = run_mode(name, args.workers, args.duration)
+        print(f'{name}: {result}')
+
+
+if __name__ == '__main__':
+    main()
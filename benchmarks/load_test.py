@@ -0,0 +1,540 @@
+"""Seed a synthetic database and measure every /api route.
+
+Two drivers are available:
+
+* ``client`` sends each route ``--iterations`` times through Flask's test
+  client (no network) and reports per-route latency.
+* ``http`` serves the app from a threaded WSGI server in a child process
+  (or uses ``--url``, e.g. a gunicorn deployment on the same ``--db``) and
+  runs ``--workers`` load generator processes for ``--duration`` seconds
+  with a weighted mix of all routes over keep-alive connections.
+
+p50/p95/p99 latency, throughput and error counts are written to a JSON file
+together with the git commit, so runs can be compared across commits. A
+seeded ``--db`` is reused on later runs.
+
+Usage: python benchmarks/load_test.py [--size small|medium|large]
+           [--driver client|http|both] [--db bench.db] [--output results.json]
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = {
+    'small': {'inventory': 10_000, 'donations': 5_000, 'wastage': 2_000,
+              'requests': 2_000, 'ngos': 200, 'platforms': 200},
+    'medium': {'inventory': 100_000, 'donations': 50_000, 'wastage': 20_000,
+               'requests': 20_000, 'ngos': 1_000, 'platforms': 1_000},
+    'large': {'inventory': 1_000_000, 'donations': 500_000, 'wastage': 200_000,
+              'requests': 200_000, 'ngos': 5_000, 'platforms': 5_000},
+}
+RESERVED_ITEMS = 5_000  # extra inventory rows that DELETE requests consume
+RESERVED_TYPE = 'Reserved batch'
+SEED_BATCH = 10_000
+HISTORY_DAYS = 365
+CATEGORIES = ('Human', 'Pet')
+STATUSES = ('Available', 'Available', 'Available', 'Donated', 'Surplus')
+REQUEST_STATUSES = ('Pending', 'Pending', 'Claimed', 'Fulfilled')
+URGENCIES = ('Normal', 'High', 'Critical')
+
+
+# ------------------------------------------------------------------ seeding
+
+def _batched(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == SEED_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(db, model, rows):
+    for batch in _batched(rows):
+        db.session.execute(model.__table__.insert(), batch)
+    db.session.commit()
+
+
+def seed(app, db, counts, rng):
+    """Fill an empty schema with ``counts`` synthetic rows per table."""
+    today = date.today()
+    now = datetime.utcnow().replace(microsecond=0)
+
+    def coords():
+        return rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)
+
+    def day():
+        return today - timedelta(days=rng.randrange(HISTORY_DAYS))
+
+    def moment():
+        return now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+
+    def located(i, kind):
+        lat, lng = coords()
+        return {'name': f'{kind} {i}', 'address': f'{i} Bench Street',
+                'latitude': lat, 'longitude': lng}
+
+    _insert(db, app.NGO, (located(i, 'NGO') for i in range(counts['ngos'])))
+    _insert(db, app.FoodPlatform, (
+        {**located(i, 'Kitchen'), 'contact': f'kitchen{i}@example.com'}
+        for i in range(counts['platforms'])))
+
+    def inventory_row(i, status=None, item_type=None):
+        quantity = float(rng.randint(1, 50))
+        status = status or STATUSES[i % len(STATUSES)]
+        item_type = item_type or f'{rng.choice(["Rice", "Dal", "Bread", "Curry", "Kibble"])} {i}'
+        return {'item_type': item_type,
+                'quantity': quantity,
+                'quantity_remaining': quantity if status == 'Available' else 0.0,
+                'date_prepared': day(), 'status': status,
+                'category': rng.choice(CATEGORIES),
+                'platform_id': rng.randint(1, counts['platforms'])}
+
+    _insert(db, app.Inventory, (inventory_row(i) for i in range(counts['inventory'])))
+    _insert(db, app.Inventory, (inventory_row(i, 'Available', RESERVED_TYPE)
+                                for i in range(RESERVED_ITEMS)))
+    _insert(db, app.Donation, (
+        {'inventory_id': rng.randint(1, counts['inventory']),
+         'ngo_id': rng.randint(1, counts['ngos']),
+         'quantity': float(rng.randint(1, 10)), 'donated_at': moment()}
+        for _ in range(counts['donations'])))
+    _insert(db, app.Wastage, (
+        {'inventory_id': rng.randint(1, counts['inventory']),
+         'quantity': float(rng.randint(1, 10)), 'reason': 'Expired',
+         'logged_at': moment()}
+        for _ in range(counts['wastage'])))
+
+    def request_row(i):
+        status = rng.choice(REQUEST_STATUSES)
+        claimed = status != 'Pending'
+        return {'ngo_id': rng.randint(1, counts['ngos']),
+                'request_type': rng.choice(CATEGORIES),
+                'quantity_needed': float(rng.randint(1, 30)),
+                'urgency': rng.choice(URGENCIES), 'status': status,
+                'description': f'Meals for shelter {i}', 'created_at': moment(),
+                'needed_by': today + timedelta(days=rng.randrange(14)),
+                'claimed_platform_id': rng.randint(1, counts['platforms']) if claimed else None}
+
+    _insert(db, app.FoodRequest, (request_row(i) for i in range(counts['requests'])))
+
+
+def prepare_database(path, counts, seed_value):
+    """Create and seed the database at ``path`` unless it already has data."""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(path)
+    from app import create_app, db
+    from jobs import enqueue, work
+    from migrations import upgrade
+
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+        if app.Inventory.query.first() is None:
+            started = time.perf_counter()
+            seed(app, db, counts, random.Random(seed_value))
+            print(f'Seeded {path} in {time.perf_counter() - started:.1f}s')
+        else:
+            print(f'Reusing seeded database {path}')
+        # Scenario parameters come from what is actually in the database;
+        # reserved rows deleted by earlier runs are skipped.
+        reserved = [row.id for row in db.session.query(app.Inventory.id)
+                    .filter(app.Inventory.item_type == RESERVED_TYPE)
+                    .order_by(app.Inventory.id)]
+        first_reserved = db.session.query(db.func.min(app.Inventory.id)).filter(
+            app.Inventory.item_type == RESERVED_TYPE).scalar()
+        # A finished export job for the job status/download routes.
+        start, end = _window(random.Random(seed_value))
+        job_id = enqueue(db, app.Job, 'export', {'source': 'donations', 'start': start,
+                                                 'end': end}).id
+        work(app, db, burst=True)
+        return app, {
+            'job': job_id,
+            'inventory': (first_reserved or 1) - 1,
+            'reserved': reserved,
+            'ngos': app.NGO.query.count(),
+            'platforms': app.FoodPlatform.query.count(),
+            'requests': app.FoodRequest.query.count(),
+            'donations': app.Donation.query.count(),
+            'wastage': app.Wastage.query.count(),
+        }
+
+
+# ---------------------------------------------------------------- scenarios
+
+def _window(rng, days=30):
+    end = date.today() - timedelta(days=rng.randrange(HISTORY_DAYS - days))
+    return (end - timedelta(days=days)).isoformat(), end.isoformat()
+
+
+def _point(rng):
+    return rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)
+
+
+def _nearby(rng, ctx):
+    lat, lng = _point(rng)
+    return 'GET', f'/api/nearby?lat={lat:.4f}&lng={lng:.4f}&radius_km=50&limit=20', None
+
+
+def _export(rng, ctx):
+    start, end = _window(rng)
+    source = rng.choice(['inventory', 'donations', 'wastage', 'food-requests'])
+    return 'GET', f'/api/export/{source}?format=ndjson&start={start}&end={end}', None
+
+
+def _trends(rng, ctx):
+    # The query shapes the endpoint serves: overall, filtered and broken down.
+    query = rng.choice([
+        '',
+        f'&category={rng.choice(CATEGORIES)}',
+        f'&platform_id={rng.randint(1, ctx["platforms"])}',
+        '&breakdown=category',
+        '&breakdown=platform',
+    ])
+    return 'GET', f'/api/analytics/trends?days={rng.choice((7, 30, 90))}{query}', None
+
+
+def _inventory_item(rng, ctx):
+    return rng.randint(1, ctx['inventory'])
+
+
+def _available_item(rng, ctx):
+    """Id of a seeded row that was created Available (see ``seed``)."""
+    while True:
+        item_id = _inventory_item(rng, ctx)
+        if STATUSES[(item_id - 1) % len(STATUSES)] == 'Available':
+            return item_id
+
+
+def _delete_item(rng, ctx):
+    position = ctx['deleted']
+    ctx['deleted'] += ctx['stride']
+    item_id = ctx['reserved'][position] if position < len(ctx['reserved']) else 0
+    return 'DELETE', f'/api/inventory/{item_id}', None
+
+
+def _submission(rng, ctx):
+    return {'platform_id': rng.randint(1, ctx['platforms']), 'item_type': 'Bench dish',
+            'quantity': rng.randint(1, 20), 'category': rng.choice(CATEGORIES)}
+
+
+# rule, method, weight in the HTTP mix, request builder
+def _viewport(rng, ctx):
+    """A map viewport of roughly 1200x800 px somewhere over the seeded area."""
+    zoom = rng.randint(4, 14)
+    width, height = 1200 * 360 / (256 * 2 ** zoom), 800 * 180 / (256 * 2 ** zoom)
+    lat, lng = rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)
+    bbox = f'{lng - width / 2:.5f},{lat - height / 2:.5f},{lng + width / 2:.5f},{lat + height / 2:.5f}'
+    return 'GET', f'/api/locations/clusters?zoom={zoom}&bbox={bbox}', None
+
+
+SCENARIOS = {
+    'inventory_list': ('/api/inventory', 'GET', 10,
+                       lambda rng, ctx: ('GET', '/api/inventory?limit=50', None)),
+    'inventory_page': ('/api/inventory', 'GET', 5, lambda rng, ctx: (
+        'GET', f'/api/inventory?limit=50&after={_inventory_item(rng, ctx)}'
+               f'&status=Available&fields=id,item_type,quantity_remaining', None)),
+    'inventory_create': ('/api/inventory', 'POST', 3, lambda rng, ctx: (
+        'POST', '/api/inventory', {'item_type': 'Bench batch', 'quantity': 10,
+                                   'platform_id': rng.randint(1, ctx['platforms'])})),
+    'inventory_get': ('/api/inventory/<int:item_id>', 'GET', 5, lambda rng, ctx: (
+        'GET', f'/api/inventory/{_inventory_item(rng, ctx)}', None)),
+    'inventory_update': ('/api/inventory/<int:item_id>', 'PUT', 2, lambda rng, ctx: (
+        'PUT', f'/api/inventory/{_inventory_item(rng, ctx)}', {'status': 'Available'})),
+    'inventory_delete': ('/api/inventory/<int:item_id>', 'DELETE', 1, _delete_item),
+    'inventory_expiring': ('/api/inventory/expiring', 'GET', 2, lambda rng, ctx: (
+        'GET', f'/api/inventory/expiring?within_hours={rng.choice((6, 24, 72))}', None)),
+    'surplus_list': ('/api/surplus-food', 'GET', 1,
+                     lambda rng, ctx: ('GET', '/api/surplus-food', None)),
+    'surplus_log': ('/api/surplus-food', 'POST', 2, lambda rng, ctx: (
+        'POST', '/api/surplus-food', {'inventory_id': _available_item(rng, ctx),
+                                      'quantity': 0.01, 'reason': 'Bench'})),
+    'donation_list': ('/api/donations', 'GET', 1,
+                      lambda rng, ctx: ('GET', '/api/donations', None)),
+    'donation_create': ('/api/donations', 'POST', 3, lambda rng, ctx: (
+        'POST', '/api/donations', {'inventory_id': _available_item(rng, ctx),
+                                   'ngo_id': rng.randint(1, ctx['ngos']),
+                                   'quantity': 0.01})),
+    'donation_batch': ('/api/donations/batch', 'POST', 1, lambda rng, ctx: (
+        'POST', '/api/donations/batch',
+        {'ngo_id': rng.randint(1, ctx['ngos']),
+         'items': [{'inventory_id': _available_item(rng, ctx), 'quantity': 0.01}
+                   for _ in range(20)],
+         'allocate': {'category': rng.choice(CATEGORIES), 'quantity': 0.5}})),
+    'ngos': ('/api/ngos', 'GET', 4, lambda rng, ctx: ('GET', '/api/ngos', None)),
+    'food_platforms': ('/api/food-platforms', 'GET', 4,
+                       lambda rng, ctx: ('GET', '/api/food-platforms', None)),
+    'locations': ('/api/locations', 'GET', 3,
+                  lambda rng, ctx: ('GET', '/api/locations', None)),
+    'location_clusters': ('/api/locations/clusters', 'GET', 5, _viewport),
+    'nearby': ('/api/nearby', 'GET', 6, _nearby),
+    'food_requests': ('/api/food-requests', 'GET', 4, lambda rng, ctx: (
+        'GET', f'/api/food-requests?status=Pending&type={rng.choice(CATEGORIES)}', None)),
+    'food_requests_search': ('/api/food-requests', 'GET', 2, lambda rng, ctx: (
+        'GET', '/api/food-requests?search=shelter%2012', None)),
+    'food_request_create': ('/api/food-requests', 'POST', 2, lambda rng, ctx: (
+        'POST', '/api/food-requests', {'ngo_id': rng.randint(1, ctx['ngos']),
+                                       'quantity_needed': 5, 'request_type': 'Human',
+                                       'urgency': rng.choice(URGENCIES)})),
+    'food_request_update': ('/api/food-requests/<int:req_id>', 'PUT', 2, lambda rng, ctx: (
+        'PUT', f'/api/food-requests/{rng.randint(1, ctx["requests"])}',
+        {'urgency': rng.choice(URGENCIES)})),
+    'submission': ('/api/restaurants/submissions', 'POST', 2, lambda rng, ctx: (
+        'POST', '/api/restaurants/submissions', _submission(rng, ctx))),
+    'submission_bulk': ('/api/restaurants/submissions/bulk', 'POST', 1, lambda rng, ctx: (
+        'POST', '/api/restaurants/submissions/bulk',
+        [_submission(rng, ctx) for _ in range(100)])),
+    'platform_route': ('/api/food-platforms/<int:platform_id>/route', 'GET', 2,
+                       lambda rng, ctx: ('GET', f'/api/food-platforms/'
+                                                f'{rng.randint(1, ctx["platforms"])}/route', None)),
+    'matching': ('/api/matching', 'POST', 1, lambda rng, ctx: (
+        'POST', '/api/matching',
+        {'request_ids': [rng.randint(1, ctx['requests']) for _ in range(100)],
+         'max_distance_km': 100})),
+    'export': ('/api/export/<source>', 'GET', 1, _export),
+    'analytics': ('/api/analytics', 'GET', 4,
+                  lambda rng, ctx: ('GET', '/api/analytics', None)),
+    'analytics_trends': ('/api/analytics/trends', 'GET', 3, _trends),
+    'analytics_forecast': ('/api/analytics/forecast', 'GET', 1,
+                           lambda rng, ctx: ('GET', '/api/analytics/forecast?kind='
+                                             + rng.choice(('platform', 'ngo')), None)),
+    'job_create': ('/api/jobs', 'POST', 1, lambda rng, ctx: (
+        'POST', '/api/jobs', {'kind': 'matching', 'params': {
+            'request_ids': [rng.randint(1, ctx['requests']) for _ in range(20)]}})),
+    'job_status': ('/api/jobs/<int:job_id>', 'GET', 2,
+                   lambda rng, ctx: ('GET', f'/api/jobs/{ctx["job"]}', None)),
+    'job_download': ('/api/jobs/<int:job_id>/download', 'GET', 1,
+                     lambda rng, ctx: ('GET', f'/api/jobs/{ctx["job"]}/download', None)),
+    'metrics': ('/api/metrics', 'GET', 1, lambda rng, ctx: ('GET', '/api/metrics', None)),
+    'cache_stats': ('/api/cache/stats', 'GET', 1,
+                    lambda rng, ctx: ('GET', '/api/cache/stats', None)),
+    'health': ('/api/health', 'GET', 1, lambda rng, ctx: ('GET', '/api/health', None)),
+}
+
+
+# Endpoints without a meaningful per-request latency: /api/events streams
+# until the client disconnects.
+UNMEASURED = {('/api/events', 'GET')}
+
+
+def uncovered_routes(app):
+    """Return ``rule METHOD`` strings of /api endpoints no scenario exercises."""
+    covered = {(rule, method) for rule, method, _, _ in SCENARIOS.values()} | UNMEASURED
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if not rule.rule.startswith('/api'):
+            continue
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            if (rule.rule, method) not in covered:
+                missing.append(f'{rule.rule} {method}')
+    return sorted(missing)
+
+
+def summarize(samples, elapsed=None):
+    """Latency percentiles (ms), throughput and status counts of samples."""
+    latencies = np.array([latency for latency, _, _ in samples]) * 1000
+    statuses = defaultdict(int)
+    for _, status, _ in samples:
+        statuses[str(status)] += 1
+    elapsed = elapsed if elapsed is not None else latencies.sum() / 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+    return {
+        'requests': len(samples),
+        'errors': sum(n for status, n in statuses.items() if not status.startswith(('2', '3'))),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(latencies.max()), 3) if len(latencies) else 0.0,
+        'mean_bytes': round(sum(size for _, _, size in samples) / max(len(samples), 1)),
+        'statuses': dict(statuses),
+    }
+
+
+# ------------------------------------------------------------------ drivers
+
+def run_client(app, ctx, requests, warmup, seed_value):
+    """Send every scenario ``requests`` times through the test client."""
+    client = app.test_client()
+    rng = random.Random(seed_value)
+    ctx = {**ctx, 'deleted': 0, 'stride': 1}
+    results = {}
+    for name, (_, _, _, build) in SCENARIOS.items():
+        samples = []
+        for attempt in range(warmup + requests):
+            method, path, body = build(rng, ctx)
+            started = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            size = len(response.get_data())
+            latency = time.perf_counter() - started
+            if attempt >= warmup:
+                samples.append((latency, response.status_code, size))
+        results[name] = summarize(samples)
+        print(f'  {name:<22} p50 {results[name]["p50_ms"]:>9.2f} ms  '
+              f'p99 {results[name]["p99_ms"]:>9.2f} ms  errors {results[name]["errors"]}')
+    return results
+
+
+def _serve(database_url, port_queue):
+    os.environ['DATABASE_URL'] = database_url
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    from app import create_app
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True,
+                         request_handler=KeepAliveHandler)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def _load_worker(args):
+    url, ctx, duration, worker, workers, seed_value = args
+    parts = urlsplit(url)
+    rng = random.Random(seed_value + worker)
+    ctx = {**ctx, 'deleted': worker, 'stride': workers}
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[name][2] for name in names]
+    samples = defaultdict(list)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, body = SCENARIOS[name][3](rng, ctx)
+        payload = None if body is None else json.dumps(body)
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        started = time.perf_counter()
+        try:
+            connection.request(method, parts.path.rstrip('/') + path, payload, headers)
+            response = connection.getresponse()
+            size = len(response.read())
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            size, status = 0, 'connection-error'
+        samples[name].append((time.perf_counter() - started, status, size))
+    connection.close()
+    return dict(samples)
+
+
+def run_http(url, database_url, ctx, workers, duration, seed_value):
+    """Drive ``url`` (or a spawned local server) with concurrent workers."""
+    spawn = multiprocessing.get_context('spawn')
+    server = None
+    if url is None:
+        port_queue = spawn.Queue()
+        server = spawn.Process(target=_serve, args=(database_url, port_queue), daemon=True)
+        server.start()
+        url = f'http://127.0.0.1:{port_queue.get(timeout=60)}'
+    try:
+        with spawn.Pool(workers) as pool:
+            started = time.perf_counter()
+            per_worker = pool.map(_load_worker, [
+                (url, ctx, duration, worker, workers, seed_value)
+                for worker in range(workers)])
+            elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+    by_route = defaultdict(list)
+    for samples in per_worker:
+        for name, route_samples in samples.items():
+            by_route[name].extend(route_samples)
+    everything = [sample for samples in by_route.values() for sample in samples]
+    return {
+        'url': url,
+        'workers': workers,
+        'duration_s': round(elapsed, 2),
+        'overall': summarize(everything, elapsed),
+        'routes': {name: summarize(by_route[name], elapsed) for name in SCENARIOS
+                   if by_route.get(name)},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=SIZES, default='small')
+    for table in SIZES['small']:
+        parser.add_argument(f'--{table}', type=int, help=f'override the {table} row count')
+    parser.add_argument('--driver', choices=['client', 'http', 'both'], default='both')
+    parser.add_argument('--db', help='database file to seed or reuse (default: temporary)')
+    parser.add_argument('--iterations', type=int, default=50, help='client driver, per route')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4, help='http driver processes')
+    parser.add_argument('--duration', type=float, default=20.0, help='http driver seconds')
+    parser.add_argument('--url', help='benchmark a running server instead of spawning one')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='load-test-results.json')
+    args = parser.parse_args()
+
+    counts = {table: getattr(args, table) or default
+              for table, default in SIZES[args.size].items()}
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='foodwise-load-'), 'bench.db')
+    os.environ.setdefault('SLOW_QUERY_MS', '1000')
+    app, ctx = prepare_database(path, counts, args.seed)
+
+    report = {
+        'commit': _git_commit(),
+        'started_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': platform.python_version(),
+        'database': os.path.abspath(path),
+        'rows': {table: ctx[table] for table in SIZES['small']},
+        'uncovered_routes': uncovered_routes(app),
+        'args': vars(args),
+    }
+    if report['uncovered_routes']:
+        print('Routes without a scenario:', ', '.join(report['uncovered_routes']))
+
+    if args.driver in ('client', 'both'):
+        print('Test client driver')
+        report['client'] = run_client(app, ctx, args.iterations, args.warmup, args.seed)
+        # The HTTP driver deletes from the reserved rows the client left.
+        ctx['reserved'] = ctx['reserved'][args.warmup + args.iterations:]
+    if args.driver in ('http', 'both'):
+        print(f'HTTP driver: {args.workers} workers for {args.duration:g}s')
+        report['http'] = run_http(args.url, os.environ['DATABASE_URL'], ctx,
+                                  args.workers, args.duration, args.seed)
+        overall = report['http']['overall']
+        print(f'  overall {overall["throughput_rps"]} req/s  p50 {overall["p50_ms"]} ms  '
+              f'p95 {overall["p95_ms"]} ms  p99 {overall["p99_ms"]} ms  '
+              f'errors {overall["errors"]}')
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Hammer one inventory item with concurrent donations from many processes.
+
+Checks conservation of quantity: donated + remaining must equal the
+starting stock, the remaining stock never goes negative and every accepted
+donation is recorded exactly once.
+
+Usage: python benchmarks/stress_stock.py [--workers 8] [--attempts 200]
+"""
+import argparse
+from collections import Counter
+import multiprocessing
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _worker(args):
+    attempts, quantity = args
+    from app import create_app
+
+    client = create_app().test_client()
+    outcomes = Counter()
+    for _ in range(attempts):
+        response = client.post('/api/donations', json={
+            'inventory_id': 1, 'ngo_id': 1, 'quantity': quantity})
+        outcomes[response.status_code] += 1
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=200,
+                        help='donation attempts per worker')
+    parser.add_argument('--stock', type=float, default=500.0)
+    parser.add_argument('--quantity', type=float, default=1.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='foodwise-stress-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'stress.db')
+
+    from app import create_app, db
+    from migrations import upgrade
+
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+        db.session.add(app.Inventory(item_type='Stress batch', quantity=args.stock,
+                                     quantity_remaining=args.stock))
+        db.session.commit()
+
+    # Spawned workers each build their own app, like separate gunicorn workers.
+    with multiprocessing.get_context('spawn').Pool(args.workers) as pool:
+        results = pool.map(_worker, [(args.attempts, args.quantity)] * args.workers)
+    outcomes = sum(results, Counter())
+
+    with app.app_context():
+        item = db.session.get(app.Inventory, 1)
+        donated = db.session.query(db.func.sum(app.Donation.quantity)).scalar() or 0
+        donations = app.Donation.query.count()
+
+    print(f'responses: {dict(outcomes)}')
+    print(f'stock={args.stock} donated={donated} remaining={item.quantity_remaining} '
+          f'status={item.status}')
+    conserved = abs(donated + item.quantity_remaining - args.stock) < 1e-6
+    checks = {
+        'quantity conserved': conserved,
+        'remaining non-negative': item.quantity_remaining >= 0,
+        'one donation per 200': donations == outcomes[200],
+    }
+    for name, passed in checks.items():
+        print(f'{"PASS" if passed else "FAIL"}: {name}')
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
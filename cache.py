@@ -0,0 +1,64 @@
+"""Small in-process cache for rarely changing reference data."""
+
+from collections import Counter, OrderedDict
+import threading
+import time
+
+
+class VersionedCache:
+    """Bounded LRU cache with a TTL and version-based invalidation.
+
+    Every entry remembers the data version it was built from; a lookup with a
+    different version (or after ``ttl`` seconds) rebuilds it through the
+    loader. Hits, misses and evictions are counted per key.
+    """
+
+    def __init__(self, maxsize=128, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = 0
+
+    def get(self, key, version, loader):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits[key] += 1
+                return entry[0]
+            self.misses[key] += 1
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = (value, version, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, prefix=''):
+        """Drop every entry whose key starts with ``prefix`` (all by default)."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            keys = set(self.hits) | set(self.misses)
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': sum(self.hits.values()),
+                'misses': sum(self.misses.values()),
+                'evictions': self.evictions,
+                'keys': {
+                    key: {'hits': self.hits[key], 'misses': self.misses[key]}
+                    for key in sorted(keys)
+                },
+            }
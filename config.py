@@ -13,3 +13,59 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', '')
+    # Serialize JSON responses with orjson when it is installed
+    USE_ORJSON = os.environ.get('USE_ORJSON', '1') != '0'
+
+    # SQLite tuning, applied to every pooled connection (ignored for other
+    # databases). Set SQLITE_TUNING=0 to use SQLite's defaults.
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') != '0'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # Connection pools: one for writes and a separate query-only pool used by
+    # GET requests (set DB_READ_POOL_SIZE=0 to disable it).
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 10))
+
+    # Request instrumentation: statements slower than SLOW_QUERY_MS are logged,
+    # and SERVER_TIMING=0 drops the Server-Timing response header.
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') != '0'
+
+    # Files written by export jobs (default: <instance>/exports)
+    JOB_EXPORT_DIR = os.environ.get('JOB_EXPORT_DIR', '')
+    # A running job whose worker has not renewed its lease for this long is
+    # queued again (or failed after MAX_ATTEMPTS in jobs.py)
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 120))
+
+    # Per-worker cache of reference data (NGOs, food platforms)
+    REFERENCE_CACHE_SIZE = int(os.environ.get('REFERENCE_CACHE_SIZE', 128))
+    REFERENCE_CACHE_TTL = float(os.environ.get('REFERENCE_CACHE_TTL', 300))
+    REFERENCE_VERSION_CHECK_SECONDS = float(os.environ.get('REFERENCE_VERSION_CHECK_SECONDS', 1))
+
+    # Live change feed (/api/events). EVENTS_URL points pages at a separate
+    # "flask events serve" process (pages only refresh live when it is set);
+    # EVENTS_ALLOW_ORIGIN is its CORS origin.
+    EVENTS_POLL_SECONDS = float(os.environ.get('EVENTS_POLL_SECONDS', 0.5))
+    EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15))
+    EVENTS_URL = os.environ.get('EVENTS_URL', '')
+    EVENTS_ALLOW_ORIGIN = os.environ.get('EVENTS_ALLOW_ORIGIN', '*')
+
+    # Inventory expires this many hours after the day it was prepared
+    # ("flask inventory sweep-expired" moves it to wastage).
+    INVENTORY_SHELF_LIFE_HOURS = float(os.environ.get('INVENTORY_SHELF_LIFE_HOURS', 48))
+
+    # Donations and wastage older than ARCHIVE_AFTER_DAYS move to a second
+    # SQLite file ("flask archive run"; default: <database>-archive.db)
+    ARCHIVE_DATABASE_PATH = os.environ.get('ARCHIVE_DATABASE_PATH', '')
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+
+    # Pickup route planning: average driving speed and time spent per stop
+    ROUTE_SPEED_KMH = float(os.environ.get('ROUTE_SPEED_KMH', 25))
+    ROUTE_STOP_MINUTES = float(os.environ.get('ROUTE_STOP_MINUTES', 10))
@@ -0,0 +1,263 @@
+"""Live change feed delivered as Server-Sent Events.
+
+Writes append rows to the ``change_event`` table (see ``EVENT_SOURCES`` in
+models.py). Each process tails that table from a single poller and fans new
+events out to its subscribers:
+
+* ``EventBroker`` serves the WSGI ``/api/events`` endpoint. Subscribers
+  share one ring buffer and one condition variable; publishing is O(1) no
+  matter how many clients wait, and no client owns a queue or a thread of
+  the broker. Every open stream still occupies a WSGI worker while it
+  waits, so large audiences belong on ``serve()`` (or a greenlet worker).
+* ``serve()`` is a standalone asyncio server (``flask events serve``) that
+  keeps thousands of idle connections on one event loop and one thread.
+
+Event ids are ``change_event`` ids, so clients resume after a reconnect by
+sending ``Last-Event-ID`` to either server.
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from models import EVENT_SOURCES
+
+TOPICS = tuple(EVENT_SOURCES)
+FETCH_LIMIT = 1000
+RETRY_MS = 3000
+
+logger = logging.getLogger(__name__)
+
+
+def parse_topics(value):
+    """Return the requested topics, or ``None`` if any is unknown."""
+    if not value:
+        return TOPICS
+    topics = tuple(topic.strip() for topic in value.split(',') if topic.strip())
+    return topics if all(topic in TOPICS for topic in topics) else None
+
+
+def format_event(event):
+    """Render a ``(id, topic, action, entity_id, payload)`` row as an SSE frame."""
+    event_id, topic, action, entity_id, payload = event
+    return (f'id: {event_id}\ndata: {{"id": {event_id}, "topic": "{topic}", '
+            f'"action": "{action}", "entity_id": {json.dumps(entity_id)}, '
+            f'"data": {payload or "null"}}}\n\n')
+
+
+class EventBroker:
+    """In-process fan-out of change events to blocking subscribers.
+
+    ``fetch(after_id, limit)`` returns events with a larger id in id order
+    and ``latest()`` the current highest id; both are called from the
+    poller thread, which only runs while someone is subscribed.
+    """
+
+    def __init__(self, fetch, latest, poll_interval=0.5, backlog=1024):
+        self._fetch = fetch
+        self._latest = latest
+        self.poll_interval = poll_interval
+        self._events = deque(maxlen=backlog)
+        self._condition = threading.Condition()
+        self._last_id = None
+        self._subscribers = 0
+        self._thread = None
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._subscribers:
+                    self._last_id = None
+                    self._condition.wait()
+            try:
+                if self._last_id is None:
+                    latest = self._latest()
+                    with self._condition:
+                        # Events written while nobody listened are not in
+                        # the buffer; emptying it makes _behind() send
+                        # resuming subscribers to the table for them.
+                        self._events.clear()
+                        self._last_id = latest
+                        self._condition.notify_all()
+                    continue
+                events = self._fetch(self._last_id, FETCH_LIMIT)
+            except Exception:
+                logger.exception('Polling change events failed')
+                events = []
+            if events:
+                with self._condition:
+                    self._events.extend(events)
+                    self._last_id = events[-1][0]
+                    self._condition.notify_all()
+                if len(events) == FETCH_LIMIT:
+                    continue
+            time.sleep(self.poll_interval)
+
+    def _behind(self, cursor):
+        """Whether events after ``cursor`` may be missing from the buffer."""
+        if self._last_id is None:
+            return False  # the poller is (re)starting; wait for it
+        if self._events:
+            return cursor < self._events[0][0] - 1
+        return cursor < self._last_id
+
+    def _newer(self, after_id):
+        newer = []
+        for event in reversed(self._events):
+            if event[0] <= after_id:
+                break
+            newer.append(event)
+        newer.reverse()
+        return newer
+
+    def subscribe(self, after_id=None, heartbeat=15.0):
+        """Yield lists of new events; an empty list means ``heartbeat`` passed."""
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-poller',
+                                                daemon=True)
+                self._thread.start()
+            self._subscribers += 1
+            self._condition.notify_all()
+        try:
+            cursor = after_id if after_id is not None else self._latest()
+            while True:
+                with self._condition:
+                    behind = self._behind(cursor)
+                    if not behind:
+                        events = self._newer(cursor)
+                        if not events:
+                            self._condition.wait(heartbeat)
+                            behind = self._behind(cursor)
+                            events = [] if behind else self._newer(cursor)
+                    last_id = self._last_id
+                if behind:
+                    # Not covered by the ring buffer: catch up from the table.
+                    events = self._fetch(cursor, FETCH_LIMIT)
+                    if not events:
+                        cursor = last_id
+                if events:
+                    cursor = events[-1][0]
+                yield events
+        finally:
+            with self._condition:
+                self._subscribers -= 1
+
+
+class _Client:
+    __slots__ = ('writer', 'topics', 'cursor')
+
+    def __init__(self, writer, topics, cursor):
+        self.writer, self.topics, self.cursor = writer, topics, cursor
+
+
+def serve(fetch, latest, host='127.0.0.1', port=5001, poll_interval=0.5,
+          heartbeat=15.0, allow_origin='*', max_buffer=1 << 20):
+    """Run the asyncio SSE server until interrupted.
+
+    ``fetch``/``latest`` are the same callables ``EventBroker`` takes; they
+    run on one helper thread so the event loop never blocks on the database.
+    Clients whose unsent data exceeds ``max_buffer`` bytes are dropped (they
+    reconnect with ``Last-Event-ID``).
+    """
+    asyncio.run(_serve(fetch, latest, host, port, poll_interval, heartbeat,
+                       allow_origin, max_buffer))
+
+
+async def _serve(fetch, latest, host, port, poll_interval, heartbeat, allow_origin,
+                 max_buffer):
+    loop = asyncio.get_running_loop()
+    database = ThreadPoolExecutor(1, thread_name_prefix='events-db')
+    clients = set()
+    state = {'last_id': await loop.run_in_executor(database, latest)}
+
+    def send(client, events):
+        frames = ''.join(format_event(e) for e in events if e[1] in client.topics)
+        if events:
+            client.cursor = events[-1][0]
+        if frames:
+            client.writer.write(frames.encode())
+        if client.writer.transport.get_write_buffer_size() > max_buffer:
+            clients.discard(client)
+            client.writer.close()
+
+    async def handle(reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+        url = urlsplit(request_line[1] if len(request_line) > 1 else '/')
+        query = parse_qs(url.query)
+        topics = parse_topics(query.get('topics', [''])[0])
+        if request_line[:1] != ['GET'] or url.path != '/api/events' or topics is None:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n'
+                         b'Connection: close\r\n\r\n')
+            writer.close()
+            return
+        try:
+            after_id = int(headers.get('last-event-id') or query.get('after', [''])[0])
+        except ValueError:
+            after_id = None
+
+        writer.write(
+            'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+            'Cache-Control: no-cache\r\nConnection: keep-alive\r\n'
+            f'Access-Control-Allow-Origin: {allow_origin}\r\n\r\n'
+            f'retry: {RETRY_MS}\n\n'.encode())
+        client = _Client(writer, topics, state['last_id'] if after_id is None else after_id)
+        # Catch up before joining the live set; nothing else runs between
+        # the final check and add(), so no event is sent twice or skipped.
+        while client.cursor < state['last_id']:
+            events = await loop.run_in_executor(database, fetch, client.cursor, FETCH_LIMIT)
+            if not events:
+                break
+            send(client, events)
+        clients.add(client)
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            clients.discard(client)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info('Serving change events on %s:%s', host, port)
+    quiet_since = loop.time()
+    async with server:
+        while True:
+            try:
+                events = await loop.run_in_executor(
+                    database, fetch, state['last_id'], FETCH_LIMIT)
+            except Exception:
+                logger.exception('Polling change events failed')
+                events = []
+            if events:
+                state['last_id'] = events[-1][0]
+                for client in list(clients):
+                    send(client, [e for e in events if e[0] > client.cursor])
+                quiet_since = loop.time()
+            elif loop.time() - quiet_since >= heartbeat:
+                for client in list(clients):
+                    client.writer.write(b': keep-alive\n\n')
+                quiet_since = loop.time()
+            if len(events) < FETCH_LIMIT:
+                await asyncio.sleep(poll_interval)
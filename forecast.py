@@ -0,0 +1,83 @@
+"""Daily forecasts for many series at once.
+
+A series is one row of an ``(entities, days)`` array of daily totals that
+ends the day before the forecast date. Every model runs on the whole array,
+so thousands of entities cost a few numpy passes:
+
+* the moving average of the last ``window`` days;
+* weekday effects: each weekday's mean minus the series mean (additive, so
+  weekdays that are always zero need no special case);
+* simple exponential smoothing of the series with the weekday effects
+  removed, computed as one product with the smoothing weights.
+
+The forecast is the smoothed level plus the target weekday's effect, never
+below zero.
+"""
+
+import numpy as np
+
+DEFAULT_WINDOW = 7
+DEFAULT_ALPHA = 0.3
+
+
+def daily_matrix(entity_ids, offsets, values, length):
+    """Sum ``(entity, day, value)`` rows into an ``(entities, length)`` array.
+
+    ``offsets`` count days from the first column; rows outside the
+    ``length`` days are ignored. Returns ``(ids, matrix)`` with the entity
+    ids sorted.
+    """
+    ids, rows = np.unique(np.asarray(entity_ids, dtype=np.int64), return_inverse=True)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    inside = (offsets >= 0) & (offsets < length)
+    cells = rows[inside] * length + offsets[inside]
+    matrix = np.bincount(cells, weights=np.asarray(values, dtype=float)[inside],
+                         minlength=len(ids) * length)
+    return ids, matrix.reshape(len(ids), length)
+
+
+def weekday_effects(series, start):
+    """Per-row mean of each weekday minus the row mean, shape ``(entities, 7)``.
+
+    Monday is column 0; weekdays missing from a short history get 0.
+    """
+    weekdays = (np.arange(series.shape[1]) + start.weekday()) % 7
+    one_hot = (weekdays[:, None] == np.arange(7)).astype(float)
+    counts = one_hot.sum(axis=0)
+    means = np.divide(series @ one_hot, counts, out=np.zeros((len(series), 7)),
+                      where=counts > 0)
+    effects = means - series.mean(axis=1, keepdims=True)
+    effects[:, counts == 0] = 0.0
+    return effects
+
+
+def smoothing_weights(length, alpha):
+    """Weights giving the final exponential smoothing level as a dot product.
+
+    The level starts at the first value, so it carries the weight left over
+    by the others.
+    """
+    weights = alpha * (1 - alpha) ** np.arange(length - 1, -1, -1, dtype=float)
+    weights[0] = (1 - alpha) ** (length - 1)
+    return weights
+
+
+def forecast(series, start, target, window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA):
+    """Forecast the day ``target`` for every row of ``series``.
+
+    ``start`` is the date of the first column. Returns a dict of arrays:
+    ``forecast``, ``moving_average``, ``smoothed`` (the deseasonalized
+    level) and ``weekday_effect`` (for the target's weekday).
+    """
+    series = np.asarray(series, dtype=float)
+    length = series.shape[1]
+    effects = weekday_effects(series, start)
+    weekdays = (np.arange(length) + start.weekday()) % 7
+    level = (series - effects[:, weekdays]) @ smoothing_weights(length, alpha)
+    effect = effects[:, target.weekday()]
+    return {
+        'forecast': np.maximum(level + effect, 0.0),
+        'moving_average': series[:, -min(window, length):].mean(axis=1),
+        'smoothed': level,
+        'weekday_effect': effect,
+    }
@@ -0,0 +1,151 @@
+"""Geospatial helpers: haversine distances, a nearest-location index and
+map marker clustering."""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+TILE_SIZE = 256  # Web Mercator tile size in pixels
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distance in km from (lat, lng) to each point of the arrays."""
+    lat1 = math.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(np.asarray(lngs) - lng)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def distance_matrix_km(lats, lngs):
+    """Pairwise great-circle distances in km between the points."""
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lngs = np.radians(np.asarray(lngs, dtype=float))
+    dlat = lats[:, None] - lats[None, :]
+    dlng = lngs[:, None] - lngs[None, :]
+    cos_lats = np.cos(lats)
+    a = np.sin(dlat / 2) ** 2 + cos_lats[:, None] * cos_lats[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+class LocationIndex:
+    """Immutable index of points sorted by latitude.
+
+    A radius query binary-searches the latitude band that can contain
+    matches, prunes it by longitude and only computes exact distances for
+    the remaining candidates.
+    """
+
+    def __init__(self, ids, lats, lngs):
+        lats = np.asarray(lats, dtype=float)
+        order = np.argsort(lats, kind='stable')
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.lats = lats[order]
+        self.lngs = np.asarray(lngs, dtype=float)[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, lat, lng, radius_km, limit=None):
+        """Return ``[(id, distance_km)]`` within ``radius_km``, nearest first."""
+        angular = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angular)
+        lo = self.lats.searchsorted(lat - dlat, side='left')
+        hi = self.lats.searchsorted(lat + dlat, side='right')
+        if lo == hi:
+            return []
+        ids, lats, lngs = self.ids[lo:hi], self.lats[lo:hi], self.lngs[lo:hi]
+
+        # Widest longitude span a point within the radius can have; no
+        # pruning is possible when the circle covers a pole.
+        cos_lat = math.cos(math.radians(lat))
+        if angular < math.pi / 2 and math.sin(angular) < cos_lat:
+            dlng = math.degrees(math.asin(math.sin(angular) / cos_lat))
+            keep = np.abs((lngs - lng + 180) % 360 - 180) <= dlng
+            ids, lats, lngs = ids[keep], lats[keep], lngs[keep]
+
+        distances = haversine_km(lat, lng, lats, lngs)
+        keep = distances <= radius_km
+        ids, distances = ids[keep], distances[keep]
+        if limit is not None and len(distances) > limit:
+            nearest = np.argpartition(distances, limit - 1)[:limit]
+            ids, distances = ids[nearest], distances[nearest]
+        order = np.argsort(distances, kind='stable')
+        return list(zip(ids[order].tolist(), distances[order].tolist()))
+
+
+def mercator_pixels(lats, lngs, zoom):
+    """Web Mercator world pixel coordinates of the points at ``zoom``."""
+    scale = TILE_SIZE * 2.0 ** zoom
+    lats = np.clip(np.asarray(lats, dtype=float), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = (np.asarray(lngs, dtype=float) + 180) / 360 * scale
+    sin_lat = np.sin(np.radians(lats))
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return x, y
+
+
+class GridClusters:
+    """Points grouped into square cells of ``cell_px`` screen pixels at ``zoom``.
+
+    Cells are fixed in Web Mercator space, so the clusters of a zoom level
+    are computed once and serve every viewport. Each cluster has the mean
+    position of its points and a count; ``ids`` holds the point id for
+    single-point clusters and -1 otherwise. Clusters are sorted by latitude
+    so a bounding box query binary-searches its latitude band.
+    """
+
+    def __init__(self, ids, lats, lngs, zoom, cell_px=64):
+        ids = np.asarray(ids, dtype=np.int64)
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        self.cell_degrees = cell_px * 360 / (TILE_SIZE * 2.0 ** zoom)
+        if not len(ids):
+            self.lats = self.lngs = np.empty(0)
+            self.counts = self.ids = self.first = np.empty(0, dtype=np.int64)
+            return
+        x, y = mercator_pixels(lats, lngs, zoom)
+        cells_per_axis = int(TILE_SIZE * 2 ** zoom // cell_px) + 1
+        keys = (x // cell_px).astype(np.int64) * cells_per_axis + (y // cell_px).astype(np.int64)
+        _, first, inverse, counts = np.unique(
+            keys, return_index=True, return_inverse=True, return_counts=True)
+        cluster_lats = np.bincount(inverse, weights=lats) / counts
+        cluster_lngs = np.bincount(inverse, weights=lngs) / counts
+        order = np.argsort(cluster_lats, kind='stable')
+        self.lats = cluster_lats[order]
+        self.lngs = cluster_lngs[order]
+        self.counts = counts[order]
+        self.first = first[order]  # position of a member in the input arrays
+        self.ids = np.where(self.counts == 1, ids[self.first], -1)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def within(self, south, west, north, east, limit=None):
+        """Positions of the clusters in the box; the largest ``limit`` if more.
+
+        ``west`` greater than ``east`` means the box crosses the antimeridian.
+        The box is widened by one cell, so clusters whose members reach into
+        it are included even when their centre lies just outside.
+        """
+        pad = self.cell_degrees
+        lo = self.lats.searchsorted(south - pad, side='left')
+        hi = self.lats.searchsorted(north + pad, side='right')
+        lngs = self.lngs[lo:hi]
+        span = east - west if west <= east else east - west + 360
+        if span + 2 * pad >= 360:
+            keep = np.ones(len(lngs), dtype=bool)
+        else:
+            west = (west - pad + 180) % 360 - 180
+            east = (east + pad + 180) % 360 - 180
+            if west <= east:
+                keep = (lngs >= west) & (lngs <= east)
+            else:
+                keep = (lngs >= west) | (lngs <= east)
+        positions = np.flatnonzero(keep) + lo
+        if limit is not None and len(positions) > limit:
+            largest = np.argpartition(-self.counts[positions], limit - 1)[:limit]
+            positions = np.sort(positions[largest])
+        return positions
@@ -0,0 +1,197 @@
+"""Persistent background jobs stored in the application database.
+
+``POST /api/jobs`` inserts a ``Queued`` row; worker processes started with
+``flask --app app jobs work`` claim jobs one at a time with a conditional
+UPDATE (so two workers never run the same job), run the handler registered
+for the job's kind in ``app.job_handlers`` and store its result or error.
+
+A handler is called as ``handler(params, progress)`` inside an application
+context and returns a JSON-serializable result. ``progress(fraction)``
+records how far the job got on a connection of its own, so it never
+commits the handler's work; on SQLite it must not be called while the
+handler holds uncommitted writes (the update would wait for them).
+
+Claiming a job takes a lease that a background thread renews every
+quarter of ``JOB_LEASE_SECONDS``. When a worker is killed its lease
+expires, and the next ``claim`` queues the job again, or fails it once it
+has been started ``MAX_ATTEMPTS`` times. Only the worker holding the lease
+records the outcome, so a worker that lost its lease (say, to a write
+lock held longer than the lease) cannot overwrite a rerun.
+"""
+
+from datetime import datetime, timedelta
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+JOB_STATUSES = ('Queued', 'Running', 'Succeeded', 'Failed')
+PROGRESS_INTERVAL_SECONDS = 0.5
+MAX_ATTEMPTS = 3
+
+
+def enqueue(db, job_model, kind, params):
+    job = job_model(kind=kind, params=params, status='Queued', progress=0)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def expire_leases(db, job_model, lease_seconds):
+    """Queue again (or fail) running jobs whose lease has expired.
+
+    Returns the number of jobs recovered.
+    """
+    now = datetime.utcnow()
+    # Jobs claimed before leases existed only have started_at.
+    expired = (job_model.status == 'Running',
+               db.func.coalesce(job_model.heartbeat_at, job_model.started_at)
+               < now - timedelta(seconds=lease_seconds))
+    failed = db.session.execute(
+        db.update(job_model)
+        .where(*expired, job_model.attempts >= MAX_ATTEMPTS)
+        .values(status='Failed', finished_at=now,
+                error=f'Worker stopped responding; gave up after {MAX_ATTEMPTS} attempts.')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    requeued = db.session.execute(
+        db.update(job_model).where(*expired)
+        .values(status='Queued', worker=None, progress=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if failed or requeued:
+        current_app.logger.warning('Expired job leases: %s queued again, %s failed',
+                                   requeued, failed)
+    return failed + requeued
+
+
+def claim(db, job_model, worker, lease_seconds=None):
+    """Mark the oldest queued job as running for ``worker`` and return it.
+
+    Jobs of workers whose lease expired are recovered first.
+    """
+    expire_leases(db, job_model, lease_seconds or current_app.config['JOB_LEASE_SECONDS'])
+    while True:
+        job_id = (db.session.query(job_model.id)
+                  .filter(job_model.status == 'Queued')
+                  .order_by(job_model.id).limit(1).scalar())
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            db.update(job_model)
+            .where(job_model.id == job_id, job_model.status == 'Queued')
+            .values(status='Running', worker=worker, started_at=datetime.utcnow(),
+                    heartbeat_at=datetime.utcnow(), attempts=job_model.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(job_model, job_id)
+
+
+def run(db, job, handler, lease_seconds=None):
+    """Run a claimed job, renewing its lease, and record its outcome."""
+    job_model = type(job)
+    job_id, params, worker = job.id, job.params or {}, job.worker
+    lease_seconds = lease_seconds or current_app.config['JOB_LEASE_SECONDS']
+    engine, logger = db.engine, current_app.logger
+    held = (job_model.id == job_id, job_model.status == 'Running',
+            job_model.worker == worker)
+    last_report = [0.0]
+
+    def update(**values):
+        try:
+            with engine.begin() as connection:
+                connection.execute(db.update(job_model).where(*held).values(
+                    heartbeat_at=datetime.utcnow(), **values))
+        except OperationalError:
+            # Advisory; skip it if the database stays locked.
+            logger.warning('Could not update running job %s', job_id)
+
+    def progress(fraction):
+        now = time.monotonic()
+        if now - last_report[0] < PROGRESS_INTERVAL_SECONDS:
+            return
+        last_report[0] = now
+        update(progress=max(0.0, min(float(fraction), 1.0)))
+
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(lease_seconds / 4):
+            update()
+
+    beating = threading.Thread(target=heartbeat, name=f'job-{job_id}-heartbeat', daemon=True)
+    beating.start()
+    try:
+        result = handler(params, progress)
+    except Exception as error:  # the job fails, the worker keeps going
+        db.session.rollback()
+        current_app.logger.exception('Job %s (%s) failed', job_id, job.kind)
+        values = {'status': 'Failed', 'error': f'{type(error).__name__}: {error}'}
+    else:
+        values = {'status': 'Succeeded', 'result': result, 'progress': 1.0}
+    finally:
+        stopped.set()
+        beating.join()
+    recorded = db.session.execute(
+        db.update(job_model).where(*held)
+        .values(finished_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+    if not recorded:
+        current_app.logger.warning('Job %s lost its lease; its outcome was not recorded',
+                                   job_id)
+
+
+def work(app, db, poll_interval=1.0, burst=False, worker=None, lease_seconds=None):
+    """Process jobs until interrupted (or, with ``burst``, the queue is empty).
+
+    Must be called inside an application context. Returns the number of
+    jobs processed.
+    """
+    worker = worker or f'{socket.gethostname()}:{os.getpid()}'
+    lease_seconds = lease_seconds or app.config['JOB_LEASE_SECONDS']
+    processed = 0
+    while True:
+        job = claim(db, app.Job, worker, lease_seconds)
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        handler = app.job_handlers.get(job.kind)
+        if handler is None:
+            def handler(params, progress, kind=job.kind):
+                raise LookupError(f'No handler for job kind {kind!r}.')
+        run(db, job, handler, lease_seconds)
+        db.session.remove()
+        processed += 1
+
+
+def _pool_worker(poll_interval, burst):
+    # Each process builds its own app (and connection pools).
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        return work(app, db, poll_interval, burst)
+
+
+def run_pool(processes, poll_interval=1.0, burst=False):
+    """Run ``processes`` worker processes; returns the jobs they processed."""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes) as pool:
+        results = [pool.apply_async(_pool_worker, (poll_interval, burst))
+                   for _ in range(processes)]
+        try:
+            return sum(result.get() for result in results)
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
@@ -0,0 +1,145 @@
+"""Greedy matching of pending food requests to available inventory.
+
+Requests are served in priority order (urgency, then ``needed_by``, then
+age). Each one draws stock from the nearest platforms holding inventory of
+the requested category, oldest batches first. Stock is grouped per platform
+and looked up through a spatial index, so a request only touches the few
+platforms around it instead of every inventory row.
+"""
+
+from collections import deque
+from datetime import date
+import math
+
+from geo import EARTH_RADIUS_KM, LocationIndex
+
+URGENCY_RANK = {'Critical': 0, 'High': 1, 'Normal': 2}
+INITIAL_RADIUS_KM = 10.0
+MAX_RADIUS_KM = EARTH_RADIUS_KM * math.pi
+
+_EPSILON = 1e-9
+
+
+class _CategoryStock:
+    """Remaining stock of one category, grouped by platform."""
+
+    def __init__(self, items):
+        self.pools = {}
+        locations = {}
+        for item in sorted(items, key=lambda i: (i['date_prepared'] or date.min, i['id'])):
+            pool = self.pools.setdefault(item['platform_id'], deque())
+            pool.append([item['id'], item['quantity_remaining']])
+            if item['platform_id'] is not None and item['latitude'] is not None \
+                    and item['longitude'] is not None:
+                locations[item['platform_id']] = (item['latitude'], item['longitude'])
+        self.locations = locations
+        self.unlocated = [key for key in self.pools if key not in locations]
+        self.stocked = len(self.pools)
+        self._build_index()
+
+    def _build_index(self):
+        located = [key for key in self.locations if self.pools.get(key)]
+        self.index = LocationIndex(
+            located,
+            [self.locations[key][0] for key in located],
+            [self.locations[key][1] for key in located],
+        )
+        self.dead = 0
+
+    def candidates(self, lat, lng, max_distance_km=None):
+        """Yield ``(platform_id, distance_km)`` with stock, nearest first.
+
+        The search radius grows geometrically, so nearby requests are
+        answered from a handful of platforms. Platforms without coordinates
+        (and every platform, when the request has no location) come last
+        with an unknown distance.
+        """
+        if not self.stocked:
+            return
+        if self.dead > len(self.index) // 2:
+            self._build_index()
+        limit = min(max_distance_km or MAX_RADIUS_KM, MAX_RADIUS_KM)
+        if lat is not None and lng is not None:
+            seen = set()
+            radius = min(INITIAL_RADIUS_KM, limit)
+            while True:
+                for key, distance in self.index.query(lat, lng, radius):
+                    if key not in seen:
+                        seen.add(key)
+                        if self.pools.get(key):
+                            yield key, distance
+                if radius >= limit:
+                    break
+                radius = min(radius * 4, limit)
+            fallback = self.unlocated
+        else:
+            fallback = list(self.pools)
+        if max_distance_km is None:
+            for key in fallback:
+                if self.pools.get(key):
+                    yield key, None
+
+    def take(self, platform_id, quantity):
+        """Consume up to ``quantity`` from a platform, oldest batches first."""
+        pool = self.pools[platform_id]
+        taken = []
+        while pool and quantity > _EPSILON:
+            entry = pool[0]
+            amount = min(entry[1], quantity)
+            taken.append((entry[0], amount))
+            entry[1] -= amount
+            quantity -= amount
+            if entry[1] <= _EPSILON:
+                pool.popleft()
+        if not pool:
+            self.stocked -= 1
+            if platform_id in self.locations:
+                self.dead += 1
+        return taken
+
+
+def priority(food_request):
+    return (
+        URGENCY_RANK.get(food_request['urgency'], len(URGENCY_RANK)),
+        food_request['needed_by'] or date.max,
+        food_request['id'],
+    )
+
+
+def match(requests, items, max_distance_km=None):
+    """Assign inventory to requests.
+
+    ``requests`` are dicts with ``id``, ``request_type``, ``quantity``,
+    ``urgency``, ``needed_by``, ``latitude`` and ``longitude`` (of the NGO).
+    ``items`` are dicts with ``id``, ``category``, ``quantity_remaining``,
+    ``platform_id``, ``date_prepared``, ``latitude`` and ``longitude`` (of
+    the platform). Returns a list of assignment dicts; a request may be split
+    across several items and may be only partially covered.
+    """
+    by_category = {}
+    for item in items:
+        if item['quantity_remaining'] and item['quantity_remaining'] > _EPSILON:
+            by_category.setdefault(item['category'], []).append(item)
+    stock = {category: _CategoryStock(rows) for category, rows in by_category.items()}
+
+    assignments = []
+    for food_request in sorted(requests, key=priority):
+        category_stock = stock.get(food_request['request_type'])
+        if category_stock is None:
+            continue
+        need = food_request['quantity']
+        candidates = category_stock.candidates(
+            food_request['latitude'], food_request['longitude'], max_distance_km)
+        for platform_id, distance in candidates:
+            for item_id, amount in category_stock.take(platform_id, need):
+                assignments.append({
+                    'request_id': food_request['id'],
+                    'inventory_id': item_id,
+                    'platform_id': platform_id,
+                    'quantity': amount,
+                    'distance_km': None if distance is None else round(distance, 3),
+                })
+                need -= amount
+            if need <= _EPSILON:
+                break
+    return assignments
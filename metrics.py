@@ -0,0 +1,114 @@
+"""Per-process request metrics rendered in the Prometheus text format."""
+
+from bisect import bisect_left
+from collections import defaultdict
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.values = defaultdict(float)
+
+    def inc(self, labels=(), amount=1.0):
+        self.values[labels] += amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_format_labels(self.labels, labels)} {value:g}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            # Bucket counts (non-cumulative, plus +Inf), sum, count.
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        names = self.labels + ('le',)
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = bound if isinstance(bound, str) else f'{bound:g}'
+                yield f'{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, labels)} {total:g}'
+            yield f'{self.name}_count{_format_labels(self.labels, labels)} {count}'
+
+
+class RequestMetrics:
+    """Latency, SQL and response size statistics per route.
+
+    Values are kept per worker process, like the default Prometheus client
+    registry; scrape every worker (or aggregate upstream) in multi-process
+    deployments.
+    """
+
+    def __init__(self, prefix='foodwise'):
+        labels = ('method', 'route', 'status')
+        self._lock = threading.Lock()
+        self.latency = Histogram(
+            f'{prefix}_request_duration_seconds', 'Time spent handling a request.',
+            LATENCY_BUCKETS, labels)
+        self.sql_queries = Histogram(
+            f'{prefix}_request_sql_queries', 'SQL statements executed per request.',
+            QUERY_COUNT_BUCKETS, labels)
+        self.sql_seconds = Histogram(
+            f'{prefix}_request_sql_seconds', 'Total SQL time per request.',
+            LATENCY_BUCKETS, labels)
+        self.response_size = Histogram(
+            f'{prefix}_response_size_bytes', 'Size of response bodies.',
+            SIZE_BUCKETS, labels)
+        self.slow_queries = Counter(
+            f'{prefix}_slow_queries_total', 'SQL statements slower than the threshold.',
+            ('route',))
+        self.collectors = [self.latency, self.sql_queries, self.sql_seconds,
+                           self.response_size, self.slow_queries]
+
+    def observe_request(self, method, route, status, seconds, queries, sql_seconds,
+                        size=None):
+        labels = (method, route, str(status))
+        with self._lock:
+            self.latency.observe(labels, seconds)
+            self.sql_queries.observe(labels, queries)
+            self.sql_seconds.observe(labels, sql_seconds)
+            if size is not None:
+                self.response_size.observe(labels, size)
+
+    def observe_slow_query(self, route):
+        with self._lock:
+            self.slow_queries.inc((route,))
+
+    def render(self, extra=()):
+        """Return the exposition text; ``extra`` adds pre-rendered lines."""
+        with self._lock:
+            lines = [line for collector in self.collectors for line in collector.render()]
+        lines.extend(extra)
+        return '\n'.join(lines) + '\n'
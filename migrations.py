@@ -0,0 +1,226 @@
+"""Versioned schema migrations.
+
+Migrations are functions registered in order with ``@migration(version,
+name)``. Each is called as ``function(connection, metadata)`` inside its own
+transaction, and its version is recorded in ``schema_version`` in the same
+transaction, so it is applied completely or not at all.
+
+``upgrade()`` is what the app runs on startup and what ``flask --app app db
+upgrade`` runs from the command line. When the database is current it costs
+one query.
+
+``create_tables`` builds the current models, so a new database already has
+every later column and index. Migrations added after it must therefore
+check before altering, as the ones below do.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateTable
+
+from models import FTS_INDEXES, fts_ddl
+
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register a migration; versions must be added in increasing order."""
+    def register(function):
+        assert not MIGRATIONS or version > MIGRATIONS[-1][0], 'migrations out of order'
+        MIGRATIONS.append((version, name, function))
+        return function
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(engine):
+    """Return the applied schema version, 0 for an unversioned database."""
+    with engine.connect() as connection:
+        try:
+            return connection.execute(
+                text('SELECT max(version) FROM schema_version')).scalar() or 0
+        except DBAPIError:
+            return 0
+
+
+def pending(engine):
+    """Return ``(version, name)`` of the migrations not applied yet."""
+    version = current_version(engine)
+    return [(v, name) for v, name, _ in MIGRATIONS if v > version]
+
+
+def upgrade(engine, metadata, echo=None):
+    """Apply pending migrations; returns the ``(version, name)`` applied."""
+    if current_version(engine) >= latest_version():
+        return []
+    with engine.begin() as connection:
+        connection.execute(CreateTable(schema_version, if_not_exists=True))
+    applied = []
+    for version, name, function in MIGRATIONS:
+        with engine.begin() as connection:
+            if connection.dialect.name == 'sqlite':
+                # pysqlite only opens a transaction before DML. Begin it now so
+                # DDL is transactional too, and so concurrent runners queue.
+                connection.exec_driver_sql('BEGIN IMMEDIATE')
+            done = connection.execute(
+                text('SELECT 1 FROM schema_version WHERE version = :version'),
+                {'version': version}).scalar()
+            if done:
+                continue
+            function(connection, metadata)
+            connection.execute(schema_version.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()))
+        applied.append((version, name))
+        if echo:
+            echo(f'Applied migration {version}: {name}')
+    return applied
+
+
+def rebuild_table(connection, table):
+    """Recreate a SQLite table from its current definition, keeping its rows.
+
+    For changes ALTER TABLE cannot make (constraints, column types). Follows
+    SQLite's documented procedure: copy into a new table, drop the old one,
+    rename, then restore the table's indexes and triggers. Runs inside the
+    migration's transaction; with WAL, readers keep reading the old table
+    until it commits. Assumes foreign key enforcement is off (the app never
+    enables it).
+    """
+    name = table.name
+    temporary = f'{name}__rebuild'
+    preparer = connection.dialect.identifier_preparer
+    existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({name})')}
+    columns = ', '.join(preparer.quote(c.name) for c in table.columns if c.name in existing)
+    dependents = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = :name "
+        "AND type IN ('index', 'trigger') AND sql IS NOT NULL "
+        "ORDER BY type = 'trigger'"), {'name': name}).scalars().all()
+
+    create = str(CreateTable(table).compile(connection)).strip()
+    create = create.replace(f'CREATE TABLE {preparer.quote(name)} (',
+                            f'CREATE TABLE {temporary} (', 1)
+    connection.exec_driver_sql(f'DROP TABLE IF EXISTS {temporary}')
+    connection.exec_driver_sql(create)
+    connection.exec_driver_sql(
+        f'INSERT INTO {temporary} ({columns}) SELECT {columns} FROM {name}')
+    connection.exec_driver_sql(f'DROP TABLE {name}')
+    # Triggers on other tables still name the dropped table; the legacy
+    # rename skips checking them (they resolve again once renamed).
+    connection.exec_driver_sql('PRAGMA legacy_alter_table = ON')
+    try:
+        connection.exec_driver_sql(f'ALTER TABLE {temporary} RENAME TO {name}')
+    finally:
+        connection.exec_driver_sql('PRAGMA legacy_alter_table = OFF')
+    for statement in dependents:
+        connection.exec_driver_sql(statement)
+
+
+# ------------------ MIGRATIONS ------------------
+
+@migration(1, 'legacy_columns')
+def _legacy_columns(connection, metadata):
+    """Columns added to inventory and food_request after their first release."""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    added = {
+        'inventory': {'category': "VARCHAR(50) DEFAULT 'Human'",
+                      'platform_id': 'INTEGER'},
+        'food_request': {'claimed_platform_id': 'INTEGER',
+                         'claimed_quantity': 'FLOAT',
+                         'claimed_at': 'DATETIME'},
+    }
+    for table, columns in added.items():
+        if table not in tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for column, definition in columns.items():
+            if column not in existing:
+                connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+
+
+@migration(2, 'create_tables')
+def _create_tables(connection, metadata):
+    """Create missing tables and the trigger-maintained data on SQLite."""
+    metadata.create_all(connection)
+
+
+@migration(3, 'indexes')
+def _indexes(connection, metadata):
+    """Create indexes added to tables that already existed."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+@migration(4, 'foreign_keys')
+def _foreign_keys(connection, metadata):
+    """Rebuild tables whose ADD COLUMN migrations left out foreign keys."""
+    if connection.dialect.name != 'sqlite':
+        return
+    inspector = inspect(connection)
+    for name in ('inventory', 'food_request'):
+        table = metadata.tables[name]
+        declared = {fk.parent.name for fk in table.foreign_keys}
+        present = {column for fk in inspector.get_foreign_keys(name)
+                   for column in fk['constrained_columns']}
+        if declared - present:
+            rebuild_table(connection, table)
+
+
+@migration(5, 'full_text_search')
+def _full_text_search(connection, metadata):
+    """FTS tables for tables that predate them, indexing the existing rows."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for table_name, (fts_name, _) in FTS_INDEXES.items():
+        for statement in fts_ddl(table_name):
+            connection.execute(text(statement))
+        connection.execute(text(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')"))
+
+
+@migration(6, 'seed_reference_data')
+def _seed_reference_data(connection, metadata):
+    """Default NGOs and food platforms for an empty database."""
+    ngo, platform = metadata.tables['ngo'], metadata.tables['food_platform']
+    if connection.execute(ngo.select().limit(1)).first() is None:
+        connection.execute(ngo.insert(), [
+            {'name': 'Helping Hands', 'address': 'Near Central Park, New Delhi',
+             'latitude': 28.6139, 'longitude': 77.2090},
+            {'name': 'Food for All', 'address': 'MG Road, Bangalore',
+             'latitude': 12.9716, 'longitude': 77.5946},
+            {'name': 'Community Kitchen', 'address': 'Marine Drive, Mumbai',
+             'latitude': 18.9407, 'longitude': 72.8353},
+        ])
+    if connection.execute(platform.select().limit(1)).first() is None:
+        connection.execute(platform.insert(), [
+            {'name': 'FoodWise Kitchen', 'address': 'Central Food Hub, New Delhi',
+             'latitude': 28.6139, 'longitude': 77.2090,
+             'contact': 'foodwise@example.com',
+             'description': 'Main kitchen facility for food preparation and distribution'},
+            {'name': 'Community Food Center', 'address': 'Downtown Location, Bangalore',
+             'latitude': 12.9352, 'longitude': 77.6245,
+             'contact': 'community@example.com',
+             'description': 'Local food preparation and donation center'},
+        ])
+
+
+@migration(7, 'job_lease')
+def _job_lease(connection, metadata):
+    """Lease columns that let workers recover jobs of crashed workers."""
+    existing = {column['name'] for column in inspect(connection).get_columns('job')}
+    added = {'heartbeat_at': 'DATETIME', 'attempts': 'INTEGER NOT NULL DEFAULT 0'}
+    for column, definition in added.items():
+        if column not in existing:
+            connection.execute(text(f'ALTER TABLE job ADD COLUMN {column} {definition}'))
@@ -1,12 +1,280 @@
-from datetime import date
+from operator import attrgetter, itemgetter
+
+from sqlalchemy import DDL, Date, DateTime, event
+
+# SQLite FTS5 indexes used for free-text search. They are external-content
+# tables, so triggers keep them in sync with the source rows.
+FTS_INDEXES = {
+    'inventory': ('inventory_fts', ['item_type']),
+    'food_request': ('food_request_fts', ['description']),
+}
+
+
+def fts_ddl(table_name):
+    """Return the statements creating the FTS table and sync triggers."""
+    fts_name, columns = FTS_INDEXES[table_name]
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{c}' for c in columns)
+    old_cols = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_name} USING fts5("
+        f"{cols}, content='{table_name}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_au AFTER UPDATE OF {cols} ON {table_name} BEGIN "
+        f"INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+
+def compile_serializer(table):
+    """Build a function turning a row object of ``table`` into a dict.
+
+    Column names and the positions of date/datetime columns are resolved
+    once. Loaded ORM instances are read straight from their ``__dict__``
+    (skipping the attribute descriptors); expired or unloaded rows fall
+    back to regular attribute access.
+    """
+    names = tuple(column.name for column in table.columns)
+    dated = tuple(
+        position for position, column in enumerate(table.columns)
+        if isinstance(column.type, (Date, DateTime))
+    )
+    loaded, attributes = itemgetter(*names), attrgetter(*names)
+    if len(names) == 1:
+        loaded = lambda state, key=names[0]: (state[key],)  # noqa: E731
+        attributes = lambda row, key=names[0]: (getattr(row, key),)  # noqa: E731
+
+    def values_of(row):
+        try:
+            return loaded(row.__dict__)
+        except (AttributeError, KeyError):
+            return attributes(row)
+
+    if not dated:
+        return lambda row: dict(zip(names, values_of(row)))
+
+    def serialize(row):
+        values = list(values_of(row))
+        for position in dated:
+            value = values[position]
+            if value is not None:
+                values[position] = value.isoformat()
+        return dict(zip(names, values))
+    return serialize
+
+
+_serializers = {}
+
 
 class BaseModel:
+    @classmethod
+    def serializer(cls):
+        """Return the compiled column serializer of this model."""
+        serialize = _serializers.get(cls)
+        if serialize is None:
+            serialize = _serializers[cls] = compile_serializer(cls.__table__)
+        return serialize
+
     def to_dict(self):
-        d = {c.name: getattr(self, c.name) for c in self.__table__.columns}
-        for k, v in d.items():
-            if isinstance(v, date):
-                d[k] = v.isoformat()
-        return d
+        return self.serializer()(self)
+
+# Running totals served by /api/analytics. Triggers on the source tables keep
+# the single analytics_totals row up to date inside the writing transaction.
+TOTALS_SOURCES = {
+    'total_wasted': ('wastage', 'quantity'),
+    'total_donated': ('donation', 'quantity'),
+    'total_inventory': ('inventory', 'quantity'),
+    'total_remaining': ('inventory', 'quantity_remaining'),
+}
+
+
+def totals_ddl():
+    """Return the statements seeding analytics_totals and its triggers."""
+    seed = ', '.join(
+        f'(SELECT coalesce(sum({column}), 0) FROM {table})'
+        for table, column in TOTALS_SOURCES.values()
+    )
+    statements = [
+        f"INSERT INTO analytics_totals (id, {', '.join(TOTALS_SOURCES)}) "
+        f"SELECT 1, {seed} WHERE NOT EXISTS (SELECT 1 FROM analytics_totals)"
+    ]
+    for table in sorted({table for table, _ in TOTALS_SOURCES.values()}):
+        counters = [(key, column) for key, (source, column) in TOTALS_SOURCES.items()
+                    if source == table]
+        columns = ', '.join(column for _, column in counters)
+        changes = {
+            'ai': ('INSERT', [f'{key} = {key} + coalesce(new.{column}, 0)' for key, column in counters]),
+            'ad': ('DELETE', [f'{key} = {key} - coalesce(old.{column}, 0)' for key, column in counters]),
+            'au': (f'UPDATE OF {columns}', [
+                f'{key} = {key} + coalesce(new.{column}, 0) - coalesce(old.{column}, 0)'
+                for key, column in counters
+            ]),
+        }
+        for suffix, (action, assignments) in changes.items():
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_totals_{suffix} AFTER {action} ON {table} BEGIN "
+                f"UPDATE analytics_totals SET {', '.join(assignments)} WHERE id = 1; END"
+            )
+    return statements
+
+
+# Per-day, per-category, per-platform totals behind /api/analytics/trends.
+# Wastage and donations are bucketed under their inventory item's category and
+# platform; rows without a platform use platform_id 0.
+ROLLUP_MEASURES = ('produced', 'donated', 'wasted')
+
+_ROLLUP_SOURCES = {
+    # table: (measure, timestamp column)
+    'wastage': ('wasted', 'logged_at'),
+    'donation': ('donated', 'donated_at'),
+}
+
+ROLLUP_SEED = (
+    "INSERT INTO daily_rollup (day, category, platform_id, produced, donated, wasted) "
+    "SELECT day, category, platform_id, sum(produced), sum(donated), sum(wasted) FROM ("
+    "SELECT date_prepared AS day, coalesce(category, 'Human') AS category, "
+    "coalesce(platform_id, 0) AS platform_id, coalesce(quantity, 0) AS produced, "
+    "0 AS donated, 0 AS wasted FROM inventory WHERE date_prepared IS NOT NULL "
+    "UNION ALL SELECT date(d.donated_at), coalesce(i.category, 'Human'), "
+    "coalesce(i.platform_id, 0), 0, d.quantity, 0 "
+    "FROM donation d LEFT JOIN inventory i ON i.id = d.inventory_id "
+    "UNION ALL SELECT date(w.logged_at), coalesce(i.category, 'Human'), "
+    "coalesce(i.platform_id, 0), 0, 0, w.quantity "
+    "FROM wastage w LEFT JOIN inventory i ON i.id = w.inventory_id"
+    ") WHERE day IS NOT NULL AND NOT EXISTS (SELECT 1 FROM daily_rollup) "
+    "GROUP BY day, category, platform_id"
+)
+
+
+def _rollup_upsert(measure, day, category, platform, amount, tail=None):
+    # A WHERE clause is required: it disambiguates ON CONFLICT from a join.
+    tail = tail or f'WHERE {day} IS NOT NULL'
+    return (
+        f"INSERT INTO daily_rollup (day, category, platform_id, {measure}) "
+        f"SELECT {day}, {category}, {platform}, {amount} {tail} "
+        f"ON CONFLICT (day, category, platform_id) "
+        f"DO UPDATE SET {measure} = {measure} + excluded.{measure};"
+    )
+
+
+def rollup_ddl():
+    """Return the statements seeding daily_rollup and its triggers."""
+
+    def inventory_bucket(row, sign):
+        return _rollup_upsert(
+            'produced', f'{row}.date_prepared', f"coalesce({row}.category, 'Human')",
+            f'coalesce({row}.platform_id, 0)', f'{sign}coalesce({row}.quantity, 0)')
+
+    def source_bucket(table, row, sign):
+        measure, column = _ROLLUP_SOURCES[table]
+        lookup = f'FROM inventory WHERE id = {row}.inventory_id'
+        return _rollup_upsert(
+            measure, f'date({row}.{column})',
+            f"coalesce((SELECT category {lookup}), 'Human')",
+            f'coalesce((SELECT platform_id {lookup}), 0)', f'{sign}{row}.quantity')
+
+    def moved_bucket(table, row, sign):
+        # Re-attribute an item's wastage/donations when its category or
+        # platform changes.
+        measure, column = _ROLLUP_SOURCES[table]
+        return _rollup_upsert(
+            measure, f'date({column})', f"coalesce({row}.category, 'Human')",
+            f'coalesce({row}.platform_id, 0)', f'{sign}sum(quantity)',
+            tail=(f'FROM {table} WHERE inventory_id = old.id AND {column} IS NOT NULL '
+                  f'GROUP BY date({column})'))
+
+    def trigger(name, action, table, body, when=''):
+        when = f' WHEN {when}' if when else ''
+        return (f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {action} ON {table}{when} "
+                f"BEGIN {' '.join(body)} END")
+
+    statements = [
+        ROLLUP_SEED,
+        trigger('inventory_rollup_ai', 'INSERT', 'inventory', [inventory_bucket('new', '')]),
+        trigger('inventory_rollup_ad', 'DELETE', 'inventory', [inventory_bucket('old', '-')]),
+        trigger('inventory_rollup_au',
+                'UPDATE OF quantity, date_prepared, category, platform_id', 'inventory',
+                [inventory_bucket('old', '-'), inventory_bucket('new', '')]),
+        trigger('inventory_rollup_move', 'UPDATE OF category, platform_id', 'inventory',
+                [moved_bucket(table, row, sign)
+                 for table in _ROLLUP_SOURCES
+                 for row, sign in (('old', '-'), ('new', ''))],
+                when='old.category IS NOT new.category OR old.platform_id IS NOT new.platform_id'),
+    ]
+    for table, (_, column) in _ROLLUP_SOURCES.items():
+        statements += [
+            trigger(f'{table}_rollup_ai', 'INSERT', table, [source_bucket(table, 'new', '')]),
+            trigger(f'{table}_rollup_ad', 'DELETE', table, [source_bucket(table, 'old', '-')]),
+            trigger(f'{table}_rollup_au',
+                    f'UPDATE OF quantity, {column}, inventory_id', table,
+                    [source_bucket(table, 'old', '-'), source_bucket(table, 'new', '')]),
+        ]
+    return statements
+
+
+# Tables whose changes bump a row in table_version. Read endpoints derive
+# their ETags from these counters and caches use them for invalidation.
+VERSIONED_TABLES = ('inventory', 'ngo', 'food_platform', 'food_request', 'donation', 'wastage')
+
+
+def version_ddl():
+    """Return the statements seeding table_version and its triggers."""
+    statements = [
+        "INSERT OR IGNORE INTO table_version (name, version, updated_at) VALUES "
+        + ', '.join(f"('{table}', 1, CURRENT_TIMESTAMP)" for table in VERSIONED_TABLES)
+    ]
+    for table in VERSIONED_TABLES:
+        for action in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{action.lower()} "
+                f"AFTER {action} ON {table} BEGIN "
+                f"UPDATE table_version SET version = version + 1, "
+                f"updated_at = CURRENT_TIMESTAMP WHERE name = '{table}'; END"
+            )
+    return statements
+
+
+# Change feed behind /api/events: triggers append one change_event row per
+# write, in the writing transaction, so every worker (and background job)
+# publishes through the same ordered log. Columns listed here become the
+# event payload.
+EVENT_SOURCES = {
+    'inventory': (('id', 'item_type', 'quantity_remaining', 'status', 'category',
+                   'platform_id'), ('INSERT', 'UPDATE', 'DELETE')),
+    'donation': (('id', 'inventory_id', 'ngo_id', 'quantity'), ('INSERT',)),
+    'wastage': (('id', 'inventory_id', 'quantity', 'reason'), ('INSERT',)),
+    'food_request': (('id', 'ngo_id', 'request_type', 'quantity_needed', 'urgency',
+                      'status', 'claimed_platform_id'), ('INSERT', 'UPDATE', 'DELETE')),
+}
+_EVENT_ACTIONS = {'INSERT': "'created'", 'UPDATE': "'updated'", 'DELETE': "'deleted'"}
+EVENT_RETENTION = 10000  # newest change events kept for reconnecting clients
+
+
+def change_event_ddl():
+    """Return the triggers appending to (and trimming) change_event."""
+    statements = [
+        f"CREATE TRIGGER IF NOT EXISTS change_event_trim AFTER INSERT ON change_event "
+        f"BEGIN DELETE FROM change_event WHERE id <= new.id - {EVENT_RETENTION}; END"
+    ]
+    for table, (columns, actions) in EVENT_SOURCES.items():
+        for action in actions:
+            row = 'old' if action == 'DELETE' else 'new'
+            payload = ', '.join(f"'{column}', {row}.{column}" for column in columns)
+            label = _EVENT_ACTIONS[action]
+            if table == 'food_request' and action == 'UPDATE':
+                label = ("CASE WHEN new.status = 'Claimed' AND old.status IS NOT 'Claimed' "
+                         "THEN 'claimed' ELSE 'updated' END")
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_event_{action.lower()} "
+                f"AFTER {action} ON {table} BEGIN "
+                f"INSERT INTO change_event (topic, action, entity_id, payload) "
+                f"VALUES ('{table}', {label}, {row}.id, json_object({payload})); END"
+            )
+    return statements
+
 
 def init_models(db):
     """Initialize models with the db instance"""
@@ -18,14 +286,17 @@ def init_models(db):
 
     class Inventory(db.Model, BaseModel):
         __tablename__ = 'inventory'
+        # Expiry sweeps and /api/inventory/expiring scan a date range per status.
+        __table_args__ = (db.Index('ix_inventory_status_date_prepared',
+                                   'status', 'date_prepared'),)
         id = db.Column(db.Integer, primary_key=True)
         item_type = db.Column(db.String(200), nullable=False)
         quantity = db.Column(db.Float, default=0)
         quantity_remaining = db.Column(db.Float, default=0)
         date_prepared = db.Column(db.Date)
-        status = db.Column(db.String(50), default='Available')
-        category = db.Column(db.String(50), default='Human')
-        platform_id = db.Column(db.Integer, db.ForeignKey('food_platform.id'))
+        status = db.Column(db.String(50), default='Available', index=True)
+        category = db.Column(db.String(50), default='Human', index=True)
+        platform_id = db.Column(db.Integer, db.ForeignKey('food_platform.id'), index=True)
 
         def to_dict(self):
             data = super().to_dict()
@@ -52,7 +323,7 @@ def init_models(db):
         inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), nullable=False)
         quantity = db.Column(db.Float, nullable=False)
         reason = db.Column(db.String(300))
-        logged_at = db.Column(db.DateTime, server_default=db.func.now())
+        logged_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
 
     class Donation(db.Model, BaseModel):
         __tablename__ = 'donation'
@@ -60,7 +331,7 @@ def init_models(db):
         inventory_id = db.Column(db.Integer, db.ForeignKey('inventory.id'), nullable=False)
         ngo_id = db.Column(db.Integer, db.ForeignKey('ngo.id'), nullable=False)
         quantity = db.Column(db.Float, nullable=False)
-        donated_at = db.Column(db.DateTime, server_default=db.func.now())
+        donated_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
 
     class FoodPlatform(db.Model, BaseModel):
         __tablename__ = 'food_platform'
@@ -76,13 +347,13 @@ def init_models(db):
         __tablename__ = 'food_request'
         id = db.Column(db.Integer, primary_key=True)
         ngo_id = db.Column(db.Integer, db.ForeignKey('ngo.id'), nullable=False)
-        request_type = db.Column(db.String(50), default='Human')
+        request_type = db.Column(db.String(50), default='Human', index=True)
         quantity_needed = db.Column(db.Float, nullable=False)
         description = db.Column(db.String(500))
         urgency = db.Column(db.String(50), default='Normal')
-        status = db.Column(db.String(50), default='Pending')
+        status = db.Column(db.String(50), default='Pending', index=True)
         needed_by = db.Column(db.Date)
-        created_at = db.Column(db.DateTime, server_default=db.func.now())
+        created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
         claimed_platform_id = db.Column(db.Integer, db.ForeignKey('food_platform.id'))
         claimed_quantity = db.Column(db.Float)
         claimed_at = db.Column(db.DateTime)
@@ -107,9 +378,74 @@ def init_models(db):
                 }
             return data
     
+    class AnalyticsTotals(db.Model, BaseModel):
+        __tablename__ = 'analytics_totals'
+        id = db.Column(db.Integer, primary_key=True)
+        total_wasted = db.Column(db.Float, nullable=False, default=0)
+        total_donated = db.Column(db.Float, nullable=False, default=0)
+        total_inventory = db.Column(db.Float, nullable=False, default=0)
+        total_remaining = db.Column(db.Float, nullable=False, default=0)
+
+    class DailyRollup(db.Model, BaseModel):
+        __tablename__ = 'daily_rollup'
+        day = db.Column(db.Date, primary_key=True)
+        category = db.Column(db.String(50), primary_key=True)
+        platform_id = db.Column(db.Integer, primary_key=True)
+        produced = db.Column(db.Float, nullable=False, default=0, server_default='0')
+        donated = db.Column(db.Float, nullable=False, default=0, server_default='0')
+        wasted = db.Column(db.Float, nullable=False, default=0, server_default='0')
+
+    class TableVersion(db.Model, BaseModel):
+        __tablename__ = 'table_version'
+        name = db.Column(db.String(50), primary_key=True)
+        version = db.Column(db.Integer, nullable=False, default=1)
+        updated_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    class Job(db.Model, BaseModel):
+        """Background job; see jobs.py for the queue and worker."""
+        __tablename__ = 'job'
+        __table_args__ = (db.Index('ix_job_status_id', 'status', 'id'),)
+        id = db.Column(db.Integer, primary_key=True)
+        kind = db.Column(db.String(50), nullable=False)
+        status = db.Column(db.String(20), nullable=False, default='Queued')
+        params = db.Column(db.JSON)
+        progress = db.Column(db.Float, nullable=False, default=0)
+        result = db.Column(db.JSON)
+        error = db.Column(db.Text)
+        worker = db.Column(db.String(100))
+        created_at = db.Column(db.DateTime, server_default=db.func.now())
+        started_at = db.Column(db.DateTime)
+        finished_at = db.Column(db.DateTime)
+        # Renewed by the running worker; an expired lease means it died.
+        heartbeat_at = db.Column(db.DateTime)
+        attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    class ChangeEvent(db.Model, BaseModel):
+        __tablename__ = 'change_event'
+        # AUTOINCREMENT: ids are event cursors and must never be reused.
+        __table_args__ = {'sqlite_autoincrement': True}
+        id = db.Column(db.Integer, primary_key=True)
+        topic = db.Column(db.String(50), nullable=False)
+        action = db.Column(db.String(20), nullable=False)
+        entity_id = db.Column(db.Integer)
+        payload = db.Column(db.Text)
+        created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    # Triggers reference every source table, so install them once all
+    # tables exist.
+    for statement in totals_ddl() + rollup_ddl() + version_ddl() + change_event_ddl():
+        event.listen(db.metadata, 'after_create',
+                     DDL(statement).execute_if(dialect='sqlite'))
+
+    for model in (Inventory, FoodRequest):
+        for statement in fts_ddl(model.__tablename__):
+            event.listen(model.__table__, 'after_create',
+                         DDL(statement).execute_if(dialect='sqlite'))
+
     # Relationships
     Inventory.platform = db.relationship('FoodPlatform', backref='inventories', lazy=True)
     FoodRequest.ngo = db.relationship('NGO', backref='requests', lazy=True)
     FoodRequest.claimed_platform = db.relationship('FoodPlatform', backref='claimed_requests', lazy=True, foreign_keys=[FoodRequest.claimed_platform_id])
     
-    return User, Inventory, NGO, Wastage, Donation, FoodPlatform, FoodRequest
\ No newline at end of file
+    return (User, Inventory, NGO, Wastage, Donation, FoodPlatform, FoodRequest,
+            AnalyticsTotals, DailyRollup, TableVersion, Job, ChangeEvent)
@@ -0,0 +1,138 @@
+"""Stop ordering for a platform's run to the NGOs whose requests it claimed.
+
+The route leaves the platform and visits every stop once, optionally
+returning at the end. Times are hours after departure: a stop's deadline is
+the end of its ``needed_by`` day and each stop takes ``service_hours``.
+Routes are compared on
+
+    distance_km + LATE_PENALTY_KM * hours_late (summed over the stops)
+
+so distance is only traded for punctuality.
+
+Two greedy tours are built and the cheaper one kept: nearest stop first
+(going straight to a stop that would otherwise miss its deadline), and
+nearest stop among those due soonest, which serves the deadlines in order
+when they are tight. 2-opt then reverses segments while that lowers the
+cost. For each segment start, the distance change of every segment end
+comes from one vectorized expression over the distance matrix; only moves
+that shorten the route get their schedule (and so their lateness)
+recomputed.
+"""
+
+import time
+
+import numpy as np
+
+from geo import distance_matrix_km
+
+LATE_PENALTY_KM = 100.0
+MOVES_PER_POSITION = 8
+MAX_PASSES = 50
+
+_EPSILON = 1e-9
+
+
+def _schedule(dist, route, speed_kmh, service_hours):
+    """Leg lengths and arrival times for ``route[1:]``."""
+    legs = dist[route[:-1], route[1:]]
+    arrivals = np.cumsum(legs / speed_kmh) + service_hours * np.arange(len(legs))
+    return legs, arrivals
+
+
+def _cost(dist, route, deadlines, speed_kmh, service_hours):
+    legs, arrivals = _schedule(dist, route, speed_kmh, service_hours)
+    late = np.maximum(arrivals - deadlines[route[1:]], 0).sum()
+    return legs.sum() + LATE_PENALTY_KM * late
+
+
+def _nearest_neighbour(dist, deadlines, speed_kmh, service_hours, by_deadline=False):
+    size = len(dist)
+    end = size - 1
+    route = [0]
+    unvisited = np.ones(size, dtype=bool)
+    unvisited[[0, end]] = False
+    current, clock = 0, 0.0
+    for _ in range(size - 2):
+        candidates = np.flatnonzero(unvisited)
+        if by_deadline:
+            candidates = candidates[deadlines[candidates] == deadlines[candidates].min()]
+        direct = clock + dist[current, candidates] / speed_kmh
+        score = dist[current, candidates] + LATE_PENALTY_KM * np.maximum(
+            direct - deadlines[candidates], 0)
+        nearest = candidates[np.argmin(score)]
+        # Stops still reachable in time now, but not after the nearest one.
+        later = clock + dist[current, nearest] / speed_kmh + service_hours \
+            + dist[nearest, candidates] / speed_kmh
+        at_risk = (direct <= deadlines[candidates]) & (later > deadlines[candidates])
+        at_risk[candidates == nearest] = False
+        if at_risk.any():
+            urgent = candidates[at_risk]
+            nearest = urgent[np.argmin(deadlines[urgent])]
+        clock += dist[current, nearest] / speed_kmh + service_hours
+        route.append(nearest)
+        unvisited[nearest] = False
+        current = nearest
+    route.append(end)
+    return np.array(route)
+
+
+def _two_opt(dist, route, deadlines, speed_kmh, service_hours, deadline_at):
+    stops = len(route) - 2
+    cost = _cost(dist, route, deadlines, speed_kmh, service_hours)
+    for _ in range(MAX_PASSES):
+        improved = False
+        for i in range(1, stops):
+            # Reverse route[i:j + 1] for every j > i at once.
+            a, b = route[i - 1], route[i]
+            ends, nexts = route[i + 1:stops + 1], route[i + 2:stops + 2]
+            delta = dist[a, ends] + dist[b, nexts] - dist[a, b] - dist[ends, nexts]
+            shorter = np.flatnonzero(delta < -_EPSILON)
+            if not len(shorter):
+                continue
+            if len(shorter) > MOVES_PER_POSITION:
+                shorter = shorter[np.argpartition(delta[shorter], MOVES_PER_POSITION)
+                                  [:MOVES_PER_POSITION]]
+            for offset in shorter[np.argsort(delta[shorter])]:
+                j = i + 1 + offset
+                candidate = route.copy()
+                candidate[i:j + 1] = route[i:j + 1][::-1]
+                candidate_cost = _cost(dist, candidate, deadlines, speed_kmh, service_hours)
+                if candidate_cost < cost - _EPSILON:
+                    route, cost = candidate, candidate_cost
+                    improved = True
+                    break
+        if not improved or time.perf_counter() > deadline_at:
+            break
+    return route
+
+
+def plan_route(origin, lats, lngs, deadlines, speed_kmh, service_hours=0.0,
+               round_trip=False, time_limit=0.5):
+    """Order the stops of a run starting at ``origin`` (``(lat, lng)``).
+
+    ``deadlines`` are hours after departure (``inf`` for none). Returns
+    ``(order, legs_km, arrivals)``: stop indices in visiting order, the
+    distance driven to reach each of them and the hour of arrival. With
+    ``round_trip`` the final leg back to the origin is appended to
+    ``legs_km`` and ``arrivals``. 2-opt stops improving after
+    ``time_limit`` seconds.
+    """
+    started = time.perf_counter()
+    count = len(lats)
+    dist = distance_matrix_km(np.r_[origin[0], lats, origin[0]],
+                              np.r_[origin[1], lngs, origin[1]])
+    if not round_trip:
+        # The route ends wherever the last stop is: a free final leg.
+        dist[-1, :] = dist[:, -1] = 0
+    deadlines = np.r_[np.inf, np.asarray(deadlines, dtype=float), np.inf]
+
+    route = min((_nearest_neighbour(dist, deadlines, speed_kmh, service_hours, by_deadline)
+                 for by_deadline in (False, True)),
+                key=lambda r: _cost(dist, r, deadlines, speed_kmh, service_hours))
+    if count > 2:
+        route = _two_opt(dist, route, deadlines, speed_kmh, service_hours,
+                         started + time_limit)
+    legs, arrivals = _schedule(dist, route, speed_kmh, service_hours)
+    if not round_trip:
+        legs, arrivals = legs[:-1], arrivals[:-1]
+    return route[1:count + 1] - 1, legs, arrivals
@@ -17,7 +17,7 @@
   function statusClass(status) {
     const normalized = (status || '').toLowerCase();
     if (normalized === 'donated') return 'donated';
-    if (normalized === 'surplus') return 'wasted';
+    if (normalized === 'surplus' || normalized === 'expired') return 'wasted';
     return 'available';
   }
 
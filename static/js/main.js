@@ -65,10 +65,35 @@
     }
   }
 
+  // One EventSource per page, shared by every subscriber. Handlers are
+  // debounced so a burst of changes triggers a single reload. Pages only
+  // connect to the standalone events server (EVENTS_URL): a stream from the
+  // app itself would hold a worker for as long as the tab stays open.
+  const listeners = [];
+  let source = null;
+
+  function subscribe(topics, handler, delay = 300) {
+    const url = document.body.dataset.eventsUrl;
+    if (!window.EventSource || !url) return;
+    const listener = { topics, handler, delay, timer: null };
+    listeners.push(listener);
+    if (source) return;
+    source = new EventSource(url);
+    source.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      listeners.forEach((l) => {
+        if (!l.topics.includes(event.topic)) return;
+        clearTimeout(l.timer);
+        l.timer = setTimeout(() => l.handler(event), l.delay);
+      });
+    };
+  }
+
   window.FoodWise = {
     notify,
     api,
     setLoading,
+    subscribe,
     handleError(error, message = 'Something went wrong') {
       console.error(error);
       notify(error?.message || message, 'danger');
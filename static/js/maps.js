@@ -45,14 +45,34 @@
       ]
     });
 
-    loadLocations();
+    // 'idle' fires after every pan/zoom settles
+    map.addListener('idle', loadClusters);
     setupEventListeners();
   }
 
-  // Load locations from API
-  async function loadLocations() {
+  const styles = {
+    ngo: { color: '#198754', letter: 'N', badge: 'bg-success', label: 'NGO' },
+    platform: { color: '#0d6efd', letter: 'F', badge: 'bg-primary', label: 'Food Platform' }
+  };
+  let requestSeq = 0;
+
+  function clusterUrl(zoom, bounds) {
+    const params = new URLSearchParams({ zoom });
+    const sw = bounds?.getSouthWest();
+    const ne = bounds?.getNorthEast();
+    // At low zoom the viewport can span the whole world; ask for everything.
+    if (sw && ne && zoom > 2) {
+      params.append('bbox', [sw.lng(), sw.lat(), ne.lng(), ne.lat()].map((v) => v.toFixed(5)).join(','));
+    }
+    return `/api/locations/clusters?${params.toString()}`;
+  }
+
+  // Load the clustered markers for the current viewport from the API
+  async function loadClusters() {
+    const seq = ++requestSeq;
     try {
-      const data = await window.FoodWise.api('/api/locations');
+      const data = await window.FoodWise.api(clusterUrl(map.getZoom(), map.getBounds()));
+      if (seq !== requestSeq) return; // a newer viewport is already loading
       updateLocationList(data);
       addMarkers(data);
     } catch (error) {
@@ -61,136 +81,95 @@
     }
   }
 
-  // Add markers to map
+  // Add markers to map: single locations get a lettered pin, clusters a
+  // count bubble that zooms in when clicked
   function addMarkers(data) {
     clearMarkers();
 
-    // NGO markers (green)
-    data.ngos.forEach((ngo) => {
-      if (ngo.latitude && ngo.longitude) {
+    Object.entries(styles).forEach(([kind, style]) => {
+      const clusters = data[kind];
+      if (!clusters) return;
+      clusters.count.forEach((count, i) => {
+        const position = { lat: clusters.lat[i], lng: clusters.lng[i] };
+        const single = count === 1;
         const marker = new google.maps.Marker({
-          position: { lat: parseFloat(ngo.latitude), lng: parseFloat(ngo.longitude) },
+          position,
           map: map,
-          title: ngo.name,
+          title: single ? clusters.name[i] : `${count} ${style.label}s`,
           icon: {
             path: google.maps.SymbolPath.CIRCLE,
-            scale: 10,
-            fillColor: '#198754',
-            fillOpacity: 1,
+            scale: single ? 10 : Math.min(12 + 6 * Math.log10(count), 28),
+            fillColor: style.color,
+            fillOpacity: single ? 1 : 0.85,
             strokeColor: '#ffffff',
             strokeWeight: 2
           },
           label: {
-            text: 'N',
+            text: single ? style.letter : String(count),
             color: '#ffffff',
-            fontSize: '10px',
+            fontSize: single ? '10px' : '11px',
             fontWeight: 'bold'
           }
         });
 
-        const content = `
-          <div class="p-2">
-            <h6 class="fw-bold text-success mb-1">${ngo.name}</h6>
-            ${ngo.address ? `<p class="small mb-1"><i class="bi bi-geo-alt"></i> ${ngo.address}</p>` : ''}
-            <div class="mt-2">
-              <span class="badge bg-success">NGO</span>
-            </div>
-          </div>
-        `;
-
         marker.addListener('click', () => {
-          infoWindow.setContent(content);
-          infoWindow.open(map, marker);
-        });
-
-        ngoMarkers.push(marker);
-        markers.push(marker);
-      }
-    });
-
-    // Food Platform markers (blue)
-    data.platforms.forEach((platform) => {
-      if (platform.latitude && platform.longitude) {
-        const marker = new google.maps.Marker({
-          position: { lat: parseFloat(platform.latitude), lng: parseFloat(platform.longitude) },
-          map: map,
-          title: platform.name,
-          icon: {
-            path: google.maps.SymbolPath.CIRCLE,
-            scale: 10,
-            fillColor: '#0d6efd',
-            fillOpacity: 1,
-            strokeColor: '#ffffff',
-            strokeWeight: 2
-          },
-          label: {
-            text: 'F',
-            color: '#ffffff',
-            fontSize: '10px',
-            fontWeight: 'bold'
+          if (!single) {
+            map.setCenter(position);
+            map.setZoom(map.getZoom() + 2);
+            return;
           }
-        });
-
-        const content = `
-          <div class="p-2">
-            <h6 class="fw-bold text-primary mb-1">${platform.name}</h6>
-            ${platform.address ? `<p class="small mb-1"><i class="bi bi-geo-alt"></i> ${platform.address}</p>` : ''}
-            ${platform.contact ? `<p class="small mb-1"><i class="bi bi-envelope"></i> ${platform.contact}</p>` : ''}
-            ${platform.description ? `<p class="small mb-2">${platform.description}</p>` : ''}
-            <div class="mt-2">
-              <span class="badge bg-primary">Food Platform</span>
+          infoWindow.setContent(`
+            <div class="p-2">
+              <h6 class="fw-bold mb-1">${clusters.name[i]}</h6>
+              <div class="mt-2">
+                <span class="badge ${style.badge}">${style.label}</span>
+              </div>
             </div>
-          </div>
-        `;
-
-        marker.addListener('click', () => {
-          infoWindow.setContent(content);
+          `);
           infoWindow.open(map, marker);
         });
 
-        platformMarkers.push(marker);
+        (kind === 'ngo' ? ngoMarkers : platformMarkers).push(marker);
         markers.push(marker);
-      }
+      });
     });
 
     updateMarkerVisibility();
   }
 
-  // Update location list sidebar
+  // Update location list sidebar with the locations in view
   function updateLocationList(data) {
     const listElement = document.getElementById('locationList');
     if (!listElement) return;
 
     let html = '';
 
-    if (data.ngos.length > 0) {
-      html += '<div class="mb-3"><strong class="text-success small">NGOs:</strong>';
-      data.ngos.forEach((ngo) => {
-        html += `
-          <div class="mt-2 p-2 border-start border-success border-3 small" data-type="ngo" data-id="${ngo.id}">
-            <strong>${ngo.name}</strong><br>
-            <span class="text-muted">${ngo.address || 'No address'}</span>
-          </div>
-        `;
-      });
-      html += '</div>';
-    }
-
-    if (data.platforms.length > 0) {
-      html += '<div><strong class="text-primary small">Food Platforms:</strong>';
-      data.platforms.forEach((platform) => {
+    Object.entries(styles).forEach(([kind, style]) => {
+      const clusters = data[kind];
+      if (!clusters || !clusters.count.length) return;
+      const border = kind === 'ngo' ? 'border-success' : 'border-primary';
+      const heading = kind === 'ngo' ? 'text-success' : 'text-primary';
+      let grouped = 0;
+      html += `<div class="mb-3"><strong class="${heading} small">${style.label}s:</strong>`;
+      clusters.count.forEach((count, i) => {
+        if (count > 1) {
+          grouped += count;
+          return;
+        }
         html += `
-          <div class="mt-2 p-2 border-start border-primary border-3 small" data-type="platform" data-id="${platform.id}">
-            <strong>${platform.name}</strong><br>
-            <span class="text-muted">${platform.address || 'No address'}</span>
+          <div class="mt-2 p-2 border-start ${border} border-3 small" data-type="${kind}" data-id="${clusters.id[i]}">
+            <strong>${clusters.name[i]}</strong>
           </div>
         `;
       });
+      if (grouped) {
+        html += `<div class="mt-2 text-muted small">${grouped.toLocaleString()} more in clusters; zoom in to see them.</div>`;
+      }
       html += '</div>';
-    }
+    });
 
     if (!html) {
-      html = '<p class="text-muted small">No locations found.</p>';
+      html = '<p class="text-muted small">No locations in this area.</p>';
     }
 
     listElement.innerHTML = html;
@@ -218,17 +197,26 @@
     });
   }
 
-  // Fit bounds to show all markers
-  function fitBounds() {
+  // Fit bounds to show all locations (world-wide clusters at a low zoom)
+  async function fitBounds() {
     const bounds = new google.maps.LatLngBounds();
     let hasMarkers = false;
+    const showNGOs = document.getElementById('filterNGOs')?.checked ?? true;
+    const showPlatforms = document.getElementById('filterPlatforms')?.checked ?? true;
 
-    markers.forEach((marker) => {
-      if (marker.getMap()) {
-        bounds.extend(marker.getPosition());
-        hasMarkers = true;
-      }
-    });
+    try {
+      const data = await window.FoodWise.api(clusterUrl(6));
+      [['ngo', showNGOs], ['platform', showPlatforms]].forEach(([kind, shown]) => {
+        if (!shown || !data[kind]) return;
+        data[kind].lat.forEach((lat, i) => {
+          bounds.extend({ lat, lng: data[kind].lng[i] });
+          hasMarkers = true;
+        });
+      });
+    } catch (error) {
+      window.FoodWise.handleError(error, 'Unable to load locations');
+      return;
+    }
 
     if (hasMarkers) {
       map.fitBounds(bounds);
@@ -142,5 +142,6 @@
   });
 
   loadRequests();
+  window.FoodWise.subscribe(['food_request'], loadRequests);
 })();
 
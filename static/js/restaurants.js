@@ -231,5 +231,7 @@
 
   loadSubmissions();
   loadRequests();
+  window.FoodWise.subscribe(['inventory'], loadSubmissions);
+  window.FoodWise.subscribe(['food_request'], loadRequests);
 })();
 
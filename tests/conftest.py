@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# config.py reads the environment when first imported, so this runs before
+# any test module imports the app.
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'foodwise.db')
+# Check reference data versions on every request, so the statements a
+# request runs do not depend on timing.
+os.environ['REFERENCE_VERSION_CHECK_SECONDS'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app():
+    """The app on a fresh, migrated SQLite file."""
+    from app import create_app, db
+    from migrations import upgrade
+
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+    return app
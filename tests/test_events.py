@@ -0,0 +1,57 @@
+"""EventBroker resumes streams without skipping events."""
+
+import time
+
+from events import EventBroker
+
+
+class _ChangeEvents:
+    """Stands in for the change_event table."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, count):
+        for _ in range(count):
+            event_id = len(self.rows) + 1
+            self.rows.append((event_id, 'inventory', 'insert', event_id, None))
+
+    def fetch(self, after_id, limit):
+        return [row for row in self.rows if row[0] > after_id][:limit]
+
+    def latest(self):
+        return self.rows[-1][0] if self.rows else 0
+
+
+def _receive(stream, until_id, timeout=5.0):
+    ids, deadline = [], time.monotonic() + timeout
+    while (not ids or ids[-1] < until_id) and time.monotonic() < deadline:
+        ids += [event[0] for event in next(stream)]
+    return ids
+
+
+def _wait_idle(broker, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while broker._last_id is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_resume_after_idle_gap_fetches_missed_events():
+    table = _ChangeEvents()
+    table.add(3)
+    broker = EventBroker(table.fetch, table.latest, poll_interval=0.01)
+
+    stream = broker.subscribe(after_id=0, heartbeat=0.05)
+    assert _receive(stream, 3) == [1, 2, 3]
+    table.add(3)  # delivered through the ring buffer
+    assert _receive(stream, 6) == [4, 5, 6]
+    stream.close()
+    _wait_idle(broker)
+
+    # Written while nobody was subscribed, so the poller never saw them.
+    table.add(5)
+    stream = broker.subscribe(after_id=6, heartbeat=0.05)
+    assert _receive(stream, 11) == [7, 8, 9, 10, 11]
+    table.add(1)
+    assert _receive(stream, 12) == [12]
+    stream.close()
@@ -0,0 +1,110 @@
+"""List endpoints must run the same number of statements at any row count.
+
+Each endpoint is requested with N rows per table and again with 10N; a
+relationship loaded per row (an N+1 query) makes the second count larger.
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+
+N = 20
+
+LIST_URLS = [
+    '/api/inventory',
+    '/api/inventory?limit=500',
+    '/api/inventory?fields=id,item_type&limit=500',
+    '/api/inventory/expiring?within_hours=168&limit=500',
+    '/api/surplus-food?limit=500',
+    '/api/donations?limit=500',
+    '/api/food-requests',
+    '/api/ngos',
+    '/api/food-platforms',
+    '/api/locations',
+]
+
+
+def _seed(app, count):
+    """Add ``count`` rows to each table, all referencing each other."""
+    now = datetime.utcnow().replace(microsecond=0)
+    with app.app_context():
+        def insert(model, rows):
+            first = (db.session.query(db.func.max(model.id)).scalar() or 0) + 1
+            db.session.execute(model.__table__.insert(), rows)
+            return range(first, first + len(rows))
+
+        ngos = insert(app.NGO, [
+            {'name': f'NGO {i}', 'latitude': 12.0 + i / 1000, 'longitude': 77.0}
+            for i in range(count)])
+        platforms = insert(app.FoodPlatform, [
+            {'name': f'Kitchen {i}', 'latitude': 13.0 + i / 1000, 'longitude': 77.0}
+            for i in range(count)])
+        items = insert(app.Inventory, [
+            {'item_type': f'Rice {i}', 'quantity': 10.0, 'quantity_remaining': 5.0,
+             'date_prepared': date.today(), 'status': 'Available',
+             'category': 'Human', 'platform_id': platform}
+            for i, platform in enumerate(platforms)])
+        db.session.execute(app.Donation.__table__.insert(), [
+            {'inventory_id': item, 'ngo_id': ngo, 'quantity': 1.0,
+             'donated_at': now - timedelta(minutes=i)}
+            for i, (item, ngo) in enumerate(zip(items, ngos))])
+        db.session.execute(app.Wastage.__table__.insert(), [
+            {'inventory_id': item, 'quantity': 1.0, 'reason': 'Expired',
+             'logged_at': now - timedelta(minutes=i)}
+            for i, item in enumerate(items)])
+        db.session.execute(app.FoodRequest.__table__.insert(), [
+            {'ngo_id': ngo, 'request_type': 'Human', 'quantity_needed': 5.0,
+             'status': 'Claimed', 'claimed_platform_id': platform,
+             'created_at': now - timedelta(minutes=i)}
+            for i, (ngo, platform) in enumerate(zip(ngos, platforms))])
+        db.session.commit()
+
+
+@contextmanager
+def _counting(app):
+    """Count statements on every engine (GET requests use the read pool)."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', count)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', count)
+
+
+def _query_counts(app):
+    client = app.test_client()
+    counts = {}
+    for url in LIST_URLS:
+        # The first request fills per-process caches; count the second.
+        assert client.get(url).status_code == 200
+        with _counting(app) as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        counts[url] = len(statements)
+    return counts
+
+
+@pytest.fixture(scope='module')
+def query_counts(app):
+    _seed(app, N)
+    small = _query_counts(app)
+    _seed(app, 9 * N)
+    return small, _query_counts(app)
+
+
+@pytest.mark.parametrize('url', LIST_URLS)
+def test_query_count_does_not_grow_with_rows(query_counts, url):
+    small, large = query_counts
+    assert large[url] == small[url]